@@ -0,0 +1,41 @@
+"""add prefix indexes to tasks full-text search
+
+Revision ID: 2b7d5e91c4f6
+Revises: f08a5c3e9d21
+Create Date: 2026-10-17 21:05:44.118263
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2b7d5e91c4f6'
+down_revision: Union[str, Sequence[str], None] = 'f08a5c3e9d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _recreate_tasks_fts(options: str) -> None:
+    # триггеры обращаются к tasks_fts по имени и переживают пересоздание таблицы
+    op.execute("DROP TABLE IF EXISTS tasks_fts")
+    op.execute(
+        f"""
+        CREATE VIRTUAL TABLE tasks_fts USING fts5(
+            title, description, content='tasks', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'{options}
+        )
+        """
+    )
+    op.execute("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _recreate_tasks_fts(", prefix='2 3'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    _recreate_tasks_fts("")
@@ -0,0 +1,38 @@
+"""add task list indexes
+
+Revision ID: 3f1d9c7a2b64
+Revises: 8c2682f0511f
+Create Date: 2026-10-17 10:12:41.204518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1d9c7a2b64'
+down_revision: Union[str, Sequence[str], None] = '8c2682f0511f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_tasks_owner_id_created_at',
+        'tasks',
+        ['owner_id', sa.text('created_at DESC'), sa.text('id DESC')],
+    )
+    op.create_index(
+        'ix_tasks_owner_id_is_done_due_date',
+        'tasks',
+        ['owner_id', 'is_done', 'due_date'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_owner_id_is_done_due_date', table_name='tasks')
+    op.drop_index('ix_tasks_owner_id_created_at', table_name='tasks')
@@ -0,0 +1,73 @@
+"""add user task stats
+
+Revision ID: 5a9f3be61c07
+Revises: d41c8e2f7a93
+Create Date: 2026-10-17 17:20:44.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a9f3be61c07'
+down_revision: Union[str, Sequence[str], None] = 'd41c8e2f7a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+UPSERT_NEW = """
+    INSERT INTO user_task_stats (user_id, total, done, last_activity)
+    VALUES (new.owner_id, 1, new.is_done, strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    ON CONFLICT (user_id) DO UPDATE SET
+        total = total + 1,
+        done = done + excluded.done,
+        last_activity = excluded.last_activity;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('user_task_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('done', sa.Integer(), nullable=False),
+    sa.Column('last_activity', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.execute(
+        """
+        INSERT INTO user_task_stats (user_id, total, done, last_activity)
+        SELECT owner_id, count(*), sum(is_done), max(updated_at) FROM tasks GROUP BY owner_id
+        """
+    )
+
+    op.execute("CREATE TRIGGER tasks_stats_ai AFTER INSERT ON tasks BEGIN" + UPSERT_NEW + "END")
+    op.execute(
+        "CREATE TRIGGER tasks_stats_au AFTER UPDATE ON tasks BEGIN"
+        " UPDATE user_task_stats SET total = total - 1, done = done - old.is_done"
+        " WHERE user_id = old.owner_id;"
+        + UPSERT_NEW
+        + "END"
+    )
+    op.execute(
+        """
+        CREATE TRIGGER tasks_stats_ad AFTER DELETE ON tasks BEGIN
+            UPDATE user_task_stats SET
+                total = total - 1,
+                done = done - old.is_done,
+                last_activity = strftime('%Y-%m-%d %H:%M:%f', 'now')
+            WHERE user_id = old.owner_id;
+        END
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS tasks_stats_ad")
+    op.execute("DROP TRIGGER IF EXISTS tasks_stats_au")
+    op.execute("DROP TRIGGER IF EXISTS tasks_stats_ai")
+    op.drop_table('user_task_stats')
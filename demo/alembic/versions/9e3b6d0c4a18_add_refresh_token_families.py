@@ -0,0 +1,33 @@
+"""add refresh token families
+
+Revision ID: 9e3b6d0c4a18
+Revises: 5a9f3be61c07
+Create Date: 2026-10-17 18:05:12.417093
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e3b6d0c4a18'
+down_revision: Union[str, Sequence[str], None] = '5a9f3be61c07'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('family_id', sa.String(), nullable=True))
+    op.create_index('ix_refresh_tokens_family_id', 'refresh_tokens', ['family_id'], unique=False)
+
+    # existing tokens each start their own family
+    op.execute("UPDATE refresh_tokens SET family_id = token_hash WHERE family_id IS NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_refresh_tokens_family_id', table_name='refresh_tokens')
+    op.drop_column('refresh_tokens', 'family_id')
@@ -0,0 +1,65 @@
+"""add task change tracking
+
+Revision ID: d41c8e2f7a93
+Revises: b7e4a19c5d20
+Create Date: 2026-10-17 15:47:03.118254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd41c8e2f7a93'
+down_revision: Union[str, Sequence[str], None] = 'b7e4a19c5d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGER_BODY = """
+    UPDATE users SET tasks_version = tasks_version + 1,
+        tasks_changed_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+    WHERE {condition};
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('tasks_version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('tasks_changed_at', sa.DateTime(), nullable=True))
+    op.add_column(
+        'tasks',
+        sa.Column('updated_at', sa.DateTime(), server_default='1970-01-01 00:00:00', nullable=False),
+    )
+    op.execute("UPDATE tasks SET updated_at = created_at")
+    op.execute(
+        "UPDATE users SET tasks_changed_at = "
+        "(SELECT max(created_at) FROM tasks WHERE tasks.owner_id = users.id)"
+    )
+
+    op.execute(
+        "CREATE TRIGGER tasks_version_ai AFTER INSERT ON tasks BEGIN"
+        + TRIGGER_BODY.format(condition="id = new.owner_id")
+        + "END"
+    )
+    op.execute(
+        "CREATE TRIGGER tasks_version_au AFTER UPDATE ON tasks BEGIN"
+        + TRIGGER_BODY.format(condition="id IN (old.owner_id, new.owner_id)")
+        + "END"
+    )
+    op.execute(
+        "CREATE TRIGGER tasks_version_ad AFTER DELETE ON tasks BEGIN"
+        + TRIGGER_BODY.format(condition="id = old.owner_id")
+        + "END"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS tasks_version_ad")
+    op.execute("DROP TRIGGER IF EXISTS tasks_version_au")
+    op.execute("DROP TRIGGER IF EXISTS tasks_version_ai")
+    op.drop_column('tasks', 'updated_at')
+    op.drop_column('users', 'tasks_changed_at')
+    op.drop_column('users', 'tasks_version')
@@ -0,0 +1,312 @@
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response
+from fastapi.routing import APIRoute
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.responses import RedirectResponse
+
+from conditional import cache_headers, check_if_match, list_etag, not_modified, task_etag
+from database import (
+    hash_password_async,
+    verify_and_update_password_async,
+    User,
+    Task,
+)
+from dependencies import get_async_db
+from jwt_manager import (
+    access_denylist,
+    access_token_claims,
+    claim_refresh_token_statement,
+    create_access_token,
+    decode_refresh_token,
+    get_current_user_async,
+    issue_refresh_token,
+    new_token_family,
+    oauth2_scheme,
+    refresh_token_insert,
+    revoke_access_token_insert,
+    revoke_refresh_token_statement,
+    revoke_reused_family_statement,
+)
+from metrics import login_failed, login_succeeded, refresh_rotated, refresh_reuse_detected
+from pagination import paginate
+from permissions import init_permissions_by_role, check_permission_async
+from schemas import Registration, Login, TaskOut, TaskUpdate, TaskIn, RefreshRequest
+from serializers import json_response, sparse_records, task_records
+from task_queries import parse_fields, task_list_statement, task_version_statement, tasks_version_statement
+
+router = APIRouter()
+
+
+async def get_user_by_email_async(db: AsyncSession, email: str) -> Optional[User]:
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+
+async def check_credentials_async(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    user = await get_user_by_email_async(db, email)
+    if not user:
+        return None
+    is_valid, new_hash = await verify_and_update_password_async(password, user.password)
+    if not is_valid:
+        return None
+    if new_hash:
+        user.password = new_hash
+        await db.commit()
+    return user
+
+
+async def authenticate_user_async(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    started = time.perf_counter()
+    user = await check_credentials_async(db, email, password)
+    (login_succeeded if user else login_failed).observe(time.perf_counter() - started)
+    return user
+
+
+async def store_refresh_token_async(db: AsyncSession, user_id: int, token: str, expires_at, family_id: str) -> None:
+    await db.execute(refresh_token_insert(user_id, token, expires_at, family_id))
+    await db.commit()
+
+
+async def rotate_refresh_token_async(db: AsyncSession, token: str, user_id: int) -> tuple[str, str]:
+    now = datetime.now(timezone.utc)
+    family_id = (await db.execute(claim_refresh_token_statement(token, user_id, now))).scalar()
+    if family_id is None:
+        await db.execute(revoke_reused_family_statement(token, now))
+        await db.commit()
+        refresh_reuse_detected.inc()
+        raise HTTPException(status_code=401, detail="Refresh token revoked")
+
+    new_access = create_access_token({"id": user_id})
+    new_refresh, expires_at = issue_refresh_token({"id": user_id})
+    await store_refresh_token_async(db, user_id, new_refresh, expires_at, family_id)
+    refresh_rotated.inc()
+    return new_access, new_refresh
+
+
+async def get_owned_task(db: AsyncSession, task_id: int, owner_id: int) -> Task:
+    task = await db.get(Task, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    if task.owner_id != owner_id:
+        raise HTTPException(status_code=403, detail="Not your task")
+    return task
+
+
+@router.post("/registration")
+async def registration(user: Registration, db: AsyncSession = Depends(get_async_db)):
+    if await get_user_by_email_async(db, user.email):
+        raise HTTPException(status_code=400, detail="Email already registered")
+    new_user = User(
+        email=user.email,
+        password=await hash_password_async(user.password),
+        permissions=init_permissions_by_role("user"),
+    )
+    db.add(new_user)
+    await db.commit()
+    return {
+        "id": new_user.id,
+        "email": new_user.email,
+        "permissions": new_user.permissions,
+    }
+
+
+@router.post("/login")
+async def login(request: Request, db: AsyncSession = Depends(get_async_db)):
+    content_type = request.headers.get("content-type", "")
+
+    if "application/json" in content_type:
+        payload = Login(**await request.json())
+        user = await authenticate_user_async(db, payload.email, payload.password)
+        if not user:
+            raise HTTPException(status_code=400, detail="Invalid credentials")
+
+        access_token = create_access_token({"id": user.id})
+        refresh_token, expires_at = issue_refresh_token({"id": user.id})
+        await store_refresh_token_async(db, user.id, refresh_token, expires_at, new_token_family())
+
+        return {
+            "access_token": access_token,
+            "refresh_token": refresh_token,
+            "token_type": "bearer",
+        }
+
+    form_data = await request.form()
+    email = form_data.get("email")
+    password = form_data.get("password")
+    if not email or not password:
+        raise HTTPException(status_code=422, detail="Email and password are required")
+
+    user = await authenticate_user_async(db, email, password)
+    if not user:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+
+    response = RedirectResponse(url="/navbooks", status_code=302)
+    response.set_cookie(
+        key="access_token",
+        value=create_access_token({"id": user.id}),
+        httponly=True,
+        samesite="lax",
+    )
+    return response
+
+
+@router.post("/token/refresh")
+async def refresh_token(request: RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    user_id = decode_refresh_token(request.refresh_token)
+    new_access, new_refresh = await rotate_refresh_token_async(db, request.refresh_token, user_id)
+
+    return {
+        "access_token": new_access,
+        "refresh_token": new_refresh,
+        "token_type": "bearer",
+    }
+
+
+@router.post("/logout")
+async def logout_api(
+    request: Request,
+    payload: Optional[RefreshRequest] = None,
+    token=Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if payload and payload.refresh_token:
+        await db.execute(revoke_refresh_token_statement(payload.refresh_token, datetime.now(timezone.utc)))
+    claims = access_token_claims(request, token)
+    if claims:
+        await db.execute(revoke_access_token_insert(claims))
+    await db.commit()
+    if claims:
+        access_denylist.add(claims["jti"], claims["exp"])
+    return {"status": "logged out"}
+
+
+@router.get("/me")
+async def me(current_user: User = Depends(get_current_user_async)):
+    return {
+        "id": current_user.id,
+        "email": current_user.email,
+        "permissions": current_user.permissions,
+    }
+
+
+@router.post("/tasks", response_model=TaskOut)
+async def create_task(
+    task: TaskIn,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_permission_async("task.create")),
+):
+    new_task = Task(
+        title=task.title,
+        description=task.description,
+        due_date=task.due_date,
+        owner_id=current_user.id,
+    )
+    db.add(new_task)
+    await db.commit()
+    return new_task
+
+
+@router.get("/tasks", response_model=list[TaskOut])
+async def get_tasks(
+    request: Request,
+    is_done: Optional[bool] = None,
+    due_before: Optional[datetime] = None,
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_permission_async("task.read")),
+):
+    selected = parse_fields(fields)
+    version, changed_at = (await db.execute(tasks_version_statement(current_user.id))).one()
+    etag = list_etag(current_user.id, version, request)
+    cached = not_modified(request, etag, changed_at)
+    if cached:
+        return cached
+
+    statement = task_list_statement(current_user.id, is_done, due_before, limit + 1, offset, cursor, selected)
+    tasks, cursor_value = paginate((await db.execute(statement)).all(), limit)
+    headers = cache_headers(etag, changed_at)
+    if cursor_value:
+        headers["X-Next-Cursor"] = cursor_value
+    if selected is not None:
+        return json_response(sparse_records(tasks, selected), headers)
+    return json_response(task_records(tasks), headers)
+
+
+@router.patch("/tasks/{task_id}", response_model=TaskOut)
+async def update_task_api(
+    task_id: int,
+    task_data: TaskUpdate,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_permission_async("task.update")),
+):
+    task = await get_owned_task(db, task_id, current_user.id)
+    check_if_match(request, task_etag(task.id, task.updated_at))
+    for field, value in task_data.model_dump(exclude_unset=True).items():
+        setattr(task, field, value)
+    await db.commit()
+    response.headers.update(cache_headers(task_etag(task.id, task.updated_at), task.updated_at))
+    return task
+
+
+@router.delete("/tasks/{task_id}")
+async def delete_task(
+    task_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_permission_async("task.delete")),
+):
+    task = await get_owned_task(db, task_id, current_user.id)
+    check_if_match(request, task_etag(task.id, task.updated_at))
+    await db.delete(task)
+    await db.commit()
+    return {"status": "deleted"}
+
+
+@router.get("/tasks/{task_id}", response_model=TaskOut)
+async def get_task(
+    task_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(check_permission_async("task.read")),
+):
+    selected = parse_fields(fields)
+    if selected or request.headers.get("if-none-match"):
+        row = (await db.execute(task_version_statement(task_id, selected or ()))).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if row.owner_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not your task")
+        etag = task_etag(task_id, row.updated_at, selected or ())
+        cached = not_modified(request, etag, row.updated_at)
+        if cached:
+            return cached
+        if selected:
+            return json_response(sparse_records([row], selected)[0], cache_headers(etag, row.updated_at))
+
+    task = await get_owned_task(db, task_id, current_user.id)
+    response.headers.update(cache_headers(task_etag(task.id, task.updated_at), task.updated_at))
+    return task
+
+
+def install_async_routes(app: FastAPI) -> None:
+    replaced = {(route.path, method) for route in router.routes for method in route.methods}
+    app.router.routes = [
+        route
+        for route in app.router.routes
+        if not (
+            isinstance(route, APIRoute)
+            and any((route.path, method) in replaced for method in route.methods)
+        )
+    ]
+    app.include_router(router)
@@ -0,0 +1,133 @@
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from sqlalchemy import create_engine, insert
+
+APP_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(APP_DIR))
+
+from database import Base, Task, User, hash_password
+from permissions import init_permissions_by_role
+
+EMAIL = "bench@example.com"
+PASSWORD = "password123"
+
+
+def seed(db_path: Path, tasks: int) -> None:
+    engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(
+            insert(User),
+            [{"email": EMAIL, "password": hash_password(PASSWORD), "permissions": init_permissions_by_role("user")}],
+        )
+        conn.execute(insert(Task), [{"title": f"task {i}", "owner_id": 1} for i in range(tasks)])
+    engine.dispose()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(mode: str, db_path: Path, port: int) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        DB_MODE=mode,
+        DATABASE_URL=f"sqlite:///{db_path}",
+        BCRYPT_ROUNDS="4",
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR,
+        env=env,
+    )
+
+
+async def wait_ready(base_url: str) -> None:
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(100):
+            try:
+                await client.get("/login")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+    raise RuntimeError("server did not start")
+
+
+async def run_load(base_url: str, concurrency: int, duration: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        login = await client.post("/login", json={"email": EMAIL, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        latencies = []
+        errors = 0
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get("/tasks", params={"limit": 20}, headers=headers)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def bench_mode(mode: str, concurrency: int, duration: float, tasks: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "bench.db"
+        seed(db_path, tasks)
+        port = free_port()
+        server = start_server(mode, db_path, port)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_ready(base_url))
+            return asyncio.run(run_load(base_url, concurrency, duration))
+        finally:
+            server.terminate()
+            server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare sync and async DB modes under concurrent load")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--tasks", type=int, default=1000)
+    args = parser.parse_args()
+
+    for mode in ("sync", "async"):
+        result = bench_mode(mode, args.concurrency, args.duration, args.tasks)
+        print(
+            f"{mode:<6} {result['rps']:8.1f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+            f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}/{result['requests']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi import HTTPException
+
+from jwt_manager import Principal
+from permissions import check_permission, init_permissions_by_role, require_any
+
+
+def legacy_check_permission(required_permission: str):
+    def checker(current_user):
+        if not current_user.permissions:
+            raise HTTPException(status_code=403, detail="Permissions not set")
+
+        user_permissions = current_user.permissions.split(",")
+        if "*" in user_permissions:
+            return current_user
+        if required_permission not in user_permissions:
+            raise HTTPException(status_code=403, detail="Permission denied")
+        return current_user
+
+    return checker
+
+
+def bench(label: str, checker, user, number: int) -> float:
+    seconds = timeit.timeit(lambda: checker(current_user=user), number=number)
+    per_call_ns = seconds / number * 1e9
+    print(f"{label:<40} {per_call_ns:8.1f} ns/check")
+    return per_call_ns
+
+
+def main(number: int = 1_000_000) -> None:
+    user = Principal(id=1, email="user@example.com", permissions=init_permissions_by_role("user"))
+
+    legacy = bench("legacy split + list membership", legacy_check_permission("task.delete"), user, number)
+    compiled = bench("compiled frozenset", check_permission("task.delete"), user, number)
+    bench(
+        "compiled any-of (2 permissions)",
+        require_any("comment.delete", "task.delete"),
+        user,
+        number,
+    )
+    print(f"speedup: {legacy / compiled:.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,68 @@
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.exc import OperationalError
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database import Base, Task, User, apply_sqlite_pragmas, sqlite_pragmas
+
+
+def make_engine(db_path: Path, profile: str):
+    engine = create_engine(f"sqlite:///{db_path}", pool_size=16, max_overflow=0)
+    pragmas = sqlite_pragmas(profile)
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"email": "bench@example.com", "password": "x", "permissions": ""}])
+    return engine
+
+
+def writer(engine, count: int) -> int:
+    failures = 0
+    for i in range(count):
+        try:
+            with engine.begin() as conn:
+                conn.execute(insert(Task), [{"title": f"task {i}", "owner_id": 1}])
+        except OperationalError:
+            failures += 1
+    return failures
+
+
+def bench(profile: str, threads: int, writes: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(Path(tmp) / "bench.db", profile)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            failures = sum(pool.map(lambda _: writer(engine, writes), range(threads)))
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    total = threads * writes
+    print(
+        f"{profile:<11} {total / elapsed:9.1f} commits/s  "
+        f"({total} commits, {threads} threads, {failures} 'database is locked')"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Write throughput per SQLite pragma profile")
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--writes", type=int, default=250)
+    args = parser.parse_args()
+
+    for profile in ("default", "production"):
+        bench(profile, args.threads, args.writes)
+
+
+if __name__ == "__main__":
+    main()
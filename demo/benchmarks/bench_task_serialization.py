@@ -0,0 +1,62 @@
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from database import Task
+from schemas import TaskOut
+from seed_db import seed
+from serializers import task_records
+from task_queries import task_list_statement
+
+TASK_LIST = TypeAdapter(list[TaskOut])
+
+
+def orm_page(db: Session, owner_id: int, limit: int) -> bytes:
+    # то, что делал get_tasks: ORM-объекты, затем валидация response_model и JSON
+    statement = task_list_statement(owner_id, limit=limit).with_only_columns(Task)
+    tasks = db.scalars(statement).all()
+    return TASK_LIST.dump_json(TASK_LIST.validate_python(tasks, from_attributes=True))
+
+
+def core_page(db: Session, owner_id: int, limit: int) -> bytes:
+    tasks = db.execute(task_list_statement(owner_id, limit=limit)).all()
+    return orjson.dumps(task_records(tasks))
+
+
+def bench(label: str, render, db: Session, owner_id: int, limit: int, pages: int) -> float:
+    render(db, owner_id, limit)
+    started = time.process_time()
+    for _ in range(pages):
+        render(db, owner_id, limit)
+        db.expunge_all()
+    per_page_us = (time.process_time() - started) / pages * 1e6
+    print(f"{label:<36} {per_page_us:9.1f} us CPU/page")
+    return per_page_us
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="CPU cost of one GET /tasks page: ORM + pydantic vs Core + orjson")
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--pages", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    seed(1, 1000, refresh_tokens_per_user=0, target=engine)
+    with Session(engine) as db:
+        assert orjson.loads(orm_page(db, 1, args.limit)) == orjson.loads(core_page(db, 1, args.limit))
+        orm = bench("ORM objects + TaskOut validation", orm_page, db, 1, args.limit, args.pages)
+        core = bench("Core rows + slots records + orjson", core_page, db, 1, args.limit, args.pages)
+    print(f"speedup: {orm / core:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from database import Base
+from dependencies import get_db
+from jwt_manager import verified_token_cache
+from main import app
+
+
+def bench(client: TestClient, headers: dict, requests: int, cache_size: int) -> float:
+    verified_token_cache.clear()
+    verified_token_cache.maxsize = cache_size
+    client.get("/me", headers=headers)
+    started = time.perf_counter()
+    for _ in range(requests):
+        client.get("/me", headers=headers)
+    return requests / (time.perf_counter() - started)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="GET /me throughput with and without the verified-token cache")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{Path(tmp) / 'bench.db'}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(bind=engine)
+        session_local = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+        def override_get_db():
+            db = session_local()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        with TestClient(app) as client:
+            credentials = {"email": "bench@example.com", "password": "password123"}
+            client.post("/registration", json=credentials)
+            token = client.post("/login", json=credentials).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+
+            maxsize = verified_token_cache.maxsize
+            off = bench(client, headers, args.requests, 0)
+            on = bench(client, headers, args.requests, maxsize)
+            print(f"{'cache off':<12} {off:8.0f} req/s")
+            print(f"{'cache on':<12} {on:8.0f} req/s")
+            print(f"speedup: {on / off:.2f}x  {verified_token_cache.stats()}")
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
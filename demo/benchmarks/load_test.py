@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+import httpx
+from sqlalchemy import create_engine
+
+APP_DIR = Path(__file__).resolve().parents[1]
+BASELINE_DIR = Path(__file__).resolve().parent / "baselines"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+sys.path.append(str(APP_DIR))
+
+from bench_db_modes import free_port, start_server, wait_ready
+from seed_db import PASSWORD, seed, user_email
+
+PAGE_SIZE = 20
+BASELINE_CONFIG_KEYS = ("mode", "users", "tasks_per_user", "concurrency", "duration", "deep_pages", "seed")
+
+# относительные веса операций в сценарии одного виртуального пользователя
+SCENARIO = {
+    "me": 20,
+    "tasks_first_page": 25,
+    "tasks_deep_cursor": 10,
+    "tasks_deep_offset": 5,
+    "path_task": 10,
+    "task_create": 10,
+    "task_patch": 10,
+    "task_delete": 5,
+    "refresh": 4,
+    "login": 1,
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {name: [] for name in SCENARIO}
+        self.errors: dict[str, int] = {name: 0 for name in SCENARIO}
+
+    def record(self, name: str, elapsed: float, ok: bool) -> None:
+        self.latencies[name].append(elapsed)
+        if not ok:
+            self.errors[name] += 1
+
+    def report(self, elapsed: float) -> dict:
+        report = {}
+        for name, latencies in self.latencies.items():
+            if not latencies:
+                continue
+            latencies.sort()
+            report[name] = {
+                "requests": len(latencies),
+                "errors": self.errors[name],
+                "rps": round(len(latencies) / elapsed, 1),
+                "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+                "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+                "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+            }
+        return report
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    return sorted_values[min(int(len(sorted_values) * fraction), len(sorted_values) - 1)]
+
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, index: int, rng: random.Random, deep_pages: int):
+        self.client = client
+        self.recorder = recorder
+        self.email = user_email(index)
+        self.rng = rng
+        self.deep_pages = deep_pages
+        self.headers: dict = {}
+        self.refresh_token = None
+        self.deep_cursor = None
+        self.created: list[int] = []
+
+    async def call(self, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.recorder.record(name, time.perf_counter() - started, False)
+            return None
+        self.recorder.record(name, time.perf_counter() - started, response.status_code < 400)
+        return response
+
+    async def login(self) -> None:
+        response = await self.call("login", "POST", "/login", json={"email": self.email, "password": PASSWORD})
+        if response is not None and response.status_code == 200:
+            self.use_tokens(response.json())
+
+    def use_tokens(self, tokens: dict) -> None:
+        self.headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+        self.refresh_token = tokens["refresh_token"]
+
+    async def find_deep_cursor(self) -> None:
+        cursor = None
+        for _ in range(self.deep_pages):
+            params = {"limit": PAGE_SIZE, **({"cursor": cursor} if cursor else {})}
+            response = await self.client.get("/tasks", params=params, headers=self.headers)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+        self.deep_cursor = cursor
+
+    async def step(self, name: str) -> None:
+        if name == "me":
+            await self.call(name, "GET", "/me", headers=self.headers)
+        elif name == "tasks_first_page":
+            await self.call(name, "GET", "/tasks", params={"limit": PAGE_SIZE}, headers=self.headers)
+        elif name == "tasks_deep_cursor":
+            params = {"limit": PAGE_SIZE, **({"cursor": self.deep_cursor} if self.deep_cursor else {})}
+            await self.call(name, "GET", "/tasks", params=params, headers=self.headers)
+        elif name == "tasks_deep_offset":
+            params = {"limit": PAGE_SIZE, "offset": PAGE_SIZE * self.deep_pages}
+            await self.call(name, "GET", "/tasks", params=params, headers=self.headers)
+        elif name == "path_task":
+            await self.call(name, "GET", "/path_task", headers=self.headers)
+        elif name == "task_create":
+            payload = {"title": f"load {self.rng.random():.6f}", "description": "x" * self.rng.randint(0, 200)}
+            response = await self.call(name, "POST", "/tasks", json=payload, headers=self.headers)
+            if response is not None and response.status_code == 200:
+                self.created.append(response.json()["id"])
+        elif name == "task_patch" and self.created:
+            task_id = self.rng.choice(self.created)
+            await self.call(name, "PATCH", f"/tasks/{task_id}", json={"is_done": True}, headers=self.headers)
+        elif name == "task_delete" and self.created:
+            task_id = self.created.pop(self.rng.randrange(len(self.created)))
+            await self.call(name, "DELETE", f"/tasks/{task_id}", headers=self.headers)
+        elif name == "refresh" and self.refresh_token:
+            response = await self.call(name, "POST", "/token/refresh", json={"refresh_token": self.refresh_token})
+            if response is not None and response.status_code == 200:
+                self.use_tokens(response.json())
+        elif name == "login":
+            await self.login()
+
+    async def run(self, deadline: float) -> None:
+        names = list(SCENARIO)
+        weights = list(SCENARIO.values())
+        while time.perf_counter() < deadline:
+            await self.step(self.rng.choices(names, weights)[0])
+
+
+async def run_load(base_url: str, args) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    warmup, recorder = Recorder(), Recorder()
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        users = [
+            VirtualUser(client, warmup, i % args.users, random.Random(args.seed + i), args.deep_pages)
+            for i in range(args.concurrency)
+        ]
+        for user in users:
+            await user.login()
+            await user.find_deep_cursor()
+            user.recorder = recorder
+
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(user.run(deadline) for user in users))
+        elapsed = time.perf_counter() - started
+    return recorder.report(elapsed)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    print(f"\n{'endpoint':<20} {'rps':>9} {'base':>9} {'p95 ms':>9} {'base':>9} {'delta':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        delta = (result["p95_ms"] - base["p95_ms"]) / base["p95_ms"] if base["p95_ms"] else 0.0
+        flag = ""
+        if delta > tolerance or result["rps"] < base["rps"] * (1 - tolerance):
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(
+            f"{name:<20} {result['rps']:9.1f} {base['rps']:9.1f} "
+            f"{result['p95_ms']:9.2f} {base['p95_ms']:9.2f} {delta:+8.1%}{flag}"
+        )
+    return regressions
+
+
+def print_results(results: dict) -> None:
+    print(f"{'endpoint':<20} {'requests':>9} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in results.items():
+        print(
+            f"{name:<20} {result['requests']:9d} {result['errors']:7d} {result['rps']:9.1f} "
+            f"{result['p50_ms']:9.2f} {result['p95_ms']:9.2f} {result['p99_ms']:9.2f}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="End-to-end load test against a local uvicorn server")
+    parser.add_argument("--mode", choices=("sync", "async"), default="sync")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks-per-user", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--deep-pages", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", default="default", help="baseline name in benchmarks/baselines")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95/rps regression fraction")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "load.db"
+        started = time.perf_counter()
+        seed_engine = create_engine(f"sqlite:///{db_path}")
+        seed(args.users, args.users * args.tasks_per_user, seed_value=args.seed, target=seed_engine)
+        seed_engine.dispose()
+        print(f"Seeded {args.users} users x {args.tasks_per_user} tasks in {time.perf_counter() - started:.1f}s")
+
+        port = free_port()
+        server = start_server(args.mode, db_path, port)
+        try:
+            base_url = f"http://127.0.0.1:{port}"
+            asyncio.run(wait_ready(base_url))
+            results = asyncio.run(run_load(base_url, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print_results(results)
+    config = {key: value for key, value in vars(args).items() if key in BASELINE_CONFIG_KEYS}
+    baseline_path = BASELINE_DIR / f"{args.baseline}.json"
+    if args.save_baseline:
+        BASELINE_DIR.mkdir(exist_ok=True)
+        baseline_path.write_text(json.dumps({"config": config, "results": results}, indent=2) + "\n")
+        print(f"\nSaved baseline to {baseline_path}")
+        return
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text())
+        if baseline["config"] != config:
+            print(f"\nNote: baseline was recorded with {baseline['config']}")
+        if compare(results, baseline["results"], args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
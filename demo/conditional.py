@@ -0,0 +1,59 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Optional
+
+from fastapi import HTTPException, Request, Response
+
+
+def _etag_values(header: str) -> list[str]:
+    return [value.strip() for value in header.split(",") if value.strip()]
+
+
+def _opaque(etag: str) -> str:
+    return etag[2:] if etag.startswith("W/") else etag
+
+
+def list_etag(owner_id: int, version: int, request: Request) -> str:
+    query = hashlib.blake2b(str(request.url.query).encode("utf-8"), digest_size=8).hexdigest()
+    return f'W/"{owner_id}-{version}-{query}"'
+
+
+def task_etag(task_id: int, updated_at: datetime, fields: tuple[str, ...] = ()) -> str:
+    version = f"{task_id}-{updated_at.timestamp():.6f}"
+    if fields:
+        # урезанное представление — другой ответ, значит и другой ETag
+        version += "-" + hashlib.blake2b(",".join(fields).encode("utf-8"), digest_size=4).hexdigest()
+    return f'"{version}"'
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.replace(tzinfo=timezone.utc), usegmt=True)
+
+
+def cache_headers(etag: str, last_modified: Optional[datetime] = None) -> dict:
+    # представление зависит от пользователя: общие кэши не должны смешивать ответы
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache", "Vary": "Authorization, Cookie"}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> Optional[Response]:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+    values = _etag_values(if_none_match)
+    if "*" in values or _opaque(etag) in {_opaque(value) for value in values}:
+        return Response(status_code=304, headers=cache_headers(etag, last_modified))
+    return None
+
+
+def check_if_match(request: Request, etag: str) -> None:
+    if_match = request.headers.get("if-match")
+    if not if_match:
+        return
+    values = _etag_values(if_match)
+    if "*" in values or etag in values:
+        return
+    raise HTTPException(status_code=412, detail="Task was modified")
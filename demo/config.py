@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 
 SECRET_KEY = os.getenv("SECRET_KEY", "change-me-in-env")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
@@ -16,3 +17,29 @@ ROLE_PERMISSIONS = {
     ],
     "admin": ["*"]
 }
+
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "60"))
+VERIFIED_TOKEN_CACHE_SIZE = int(os.getenv("VERIFIED_TOKEN_CACHE_SIZE", "10000"))
+
+PATH_TASK_PAGE_SIZE = int(os.getenv("PATH_TASK_PAGE_SIZE", "20"))
+
+TASK_BATCH_MAX_ITEMS = int(os.getenv("TASK_BATCH_MAX_ITEMS", "500"))
+TASK_IMPORT_CHUNK_SIZE = int(os.getenv("TASK_IMPORT_CHUNK_SIZE", "1000"))
+TASK_IMPORT_MAX_ERRORS = int(os.getenv("TASK_IMPORT_MAX_ERRORS", "100"))
+
+REFRESH_TOKEN_GC_INTERVAL_SECONDS = float(os.getenv("REFRESH_TOKEN_GC_INTERVAL_SECONDS", "3600"))
+REFRESH_TOKEN_GC_BATCH_SIZE = int(os.getenv("REFRESH_TOKEN_GC_BATCH_SIZE", "500"))
+
+ACCESS_DENYLIST_BLOOM_BITS = int(os.getenv("ACCESS_DENYLIST_BLOOM_BITS", str(1 << 20)))
+ACCESS_DENYLIST_BLOOM_HASHES = int(os.getenv("ACCESS_DENYLIST_BLOOM_HASHES", "7"))
+
+SQL_SLOW_QUERY_MS = float(os.getenv("SQL_SLOW_QUERY_MS", "200"))
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+PROFILER_OUTPUT_DIR = os.getenv("PROFILER_OUTPUT_DIR", str(Path(__file__).resolve().parent / "profiles"))
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "5"))
+PROFILER_HEADER = os.getenv("PROFILER_HEADER", "X-Profile")
+# пустой секрет отключает профилирование по заголовку
+PROFILER_HEADER_SECRET = os.getenv("PROFILER_HEADER_SECRET", "")
+PROFILER_MAX_FILES = int(os.getenv("PROFILER_MAX_FILES", "200"))
@@ -1,27 +1,163 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
 from pathlib import Path
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, ForeignKey, DateTime
+import threading
+from typing import Optional
+from sqlalchemy import create_engine, event, DDL, Column, Integer, String, Boolean, ForeignKey, DateTime, Index
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base, relationship
 from passlib.context import CryptContext
 
+from metrics import instrument_engine, password_hash_duration
+
 BASE_DIR = Path(__file__).resolve().parent
 DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{BASE_DIR / 'database.db'}")
 SQL_ECHO = os.getenv("SQL_ECHO", "false").lower() == "true"
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+ASYNC_DATABASE_URL = os.getenv(
+    "ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1),
+)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", "64"))
+
+SQLITE_PROFILE = os.getenv("SQLITE_PROFILE", "production").lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))
+
+SQLITE_PROFILES = {
+    "default": {},
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": "5000",
+        "mmap_size": "268435456",
+        "cache_size": "-65536",
+        "temp_store": "MEMORY",
+    },
+}
+
+
+def sqlite_pragmas(profile: str = SQLITE_PROFILE) -> dict:
+    pragmas = dict(SQLITE_PROFILES[profile])
+    for name in ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size", "temp_store"):
+        value = os.getenv(f"SQLITE_{name.upper()}")
+        if value:
+            pragmas[name] = value
+    return pragmas
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas: dict) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def _is_memory_database(url: str) -> bool:
+    return url.endswith(":memory:") or url.split("?")[0].endswith("://")
+
+
+def _engine_options(url: str) -> dict:
+    if _is_memory_database(url):
+        return {}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
 
-engine = create_engine(DATABASE_URL, echo=SQL_ECHO)
+
+def _install_sqlite_pragmas(sync_engine) -> None:
+    if sync_engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas()
+    if not pragmas:
+        return
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+
+engine = create_engine(DATABASE_URL, echo=SQL_ECHO, **_engine_options(DATABASE_URL))
+_install_sqlite_pragmas(engine)
+instrument_engine(engine, "sync")
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+async_engine = None
+if DB_MODE == "async":
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, echo=SQL_ECHO, **_engine_options(ASYNC_DATABASE_URL)
+    )
+    _install_sqlite_pragmas(async_engine.sync_engine)
+    instrument_engine(async_engine.sync_engine, "async")
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+)
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE)
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+_hash_timer = password_hash_duration.labels("hash")
+_verify_timer = password_hash_duration.labels("verify")
 
 
 def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+    with _hash_timer.time():
+        return pwd_context.hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with _verify_timer.time():
+        return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, Optional[str]]:
+    with _verify_timer.time():
+        return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def _run_password_job(func, *args):
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordHasherBusy()
+    future = password_executor.submit(func, *args)
+    future.add_done_callback(lambda _: _password_slots.release())
+    return await asyncio.wrap_future(future)
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_job(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(verify_password, plain_password, hashed_password)
+
+
+async def verify_and_update_password_async(
+    plain_password: str, hashed_password: str
+) -> tuple[bool, Optional[str]]:
+    return await _run_password_job(verify_and_update_password, plain_password, hashed_password)
 
 
 class User(Base):
@@ -31,6 +167,8 @@ class User(Base):
     email = Column(String, unique=True, nullable=False)
     password = Column(String, nullable=False)
     permissions = Column(String, nullable=False)
+    tasks_version = Column(Integer, default=0, server_default="0", nullable=False)
+    tasks_changed_at = Column(DateTime, nullable=True)
 
     tasks = relationship("Task", back_populates="owner")
 
@@ -44,26 +182,145 @@ class Task(Base):
     due_date = Column(DateTime, nullable=True)
     is_done = Column(Boolean, default=False, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
 
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     owner = relationship("User", back_populates="tasks")
 
+    __table_args__ = (
+        Index("ix_tasks_owner_id_created_at", "owner_id", created_at.desc(), id.desc()),
+        Index("ix_tasks_owner_id_is_done_due_date", "owner_id", "is_done", "due_date"),
+    )
+
+
+class UserTaskStats(Base):
+    __tablename__ = "user_task_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    total = Column(Integer, default=0, nullable=False)
+    done = Column(Integer, default=0, nullable=False)
+    last_activity = Column(DateTime, nullable=True)
+
+
+TASKS_FTS_DDL = (
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts USING fts5(
+        title, description, content='tasks', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_ad AFTER DELETE ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_fts_au AFTER UPDATE OF title, description ON tasks BEGIN
+        INSERT INTO tasks_fts(tasks_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO tasks_fts(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END
+    """,
+)
+
+TASKS_VERSION_DDL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_version_ai AFTER INSERT ON tasks BEGIN
+        UPDATE users SET tasks_version = tasks_version + 1,
+            tasks_changed_at = strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now')
+        WHERE id = new.owner_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_version_au AFTER UPDATE ON tasks BEGIN
+        UPDATE users SET tasks_version = tasks_version + 1,
+            tasks_changed_at = strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now')
+        WHERE id IN (old.owner_id, new.owner_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_version_ad AFTER DELETE ON tasks BEGIN
+        UPDATE users SET tasks_version = tasks_version + 1,
+            tasks_changed_at = strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now')
+        WHERE id = old.owner_id;
+    END
+    """,
+)
+
+TASKS_STATS_DDL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_stats_ai AFTER INSERT ON tasks BEGIN
+        INSERT INTO user_task_stats (user_id, total, done, last_activity)
+        VALUES (new.owner_id, 1, new.is_done, strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now'))
+        ON CONFLICT (user_id) DO UPDATE SET
+            total = total + 1,
+            done = done + excluded.done,
+            last_activity = excluded.last_activity;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_stats_au AFTER UPDATE ON tasks BEGIN
+        UPDATE user_task_stats SET total = total - 1, done = done - old.is_done
+        WHERE user_id = old.owner_id;
+        INSERT INTO user_task_stats (user_id, total, done, last_activity)
+        VALUES (new.owner_id, 1, new.is_done, strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now'))
+        ON CONFLICT (user_id) DO UPDATE SET
+            total = total + 1,
+            done = done + excluded.done,
+            last_activity = excluded.last_activity;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS tasks_stats_ad AFTER DELETE ON tasks BEGIN
+        UPDATE user_task_stats SET
+            total = total - 1,
+            done = done - old.is_done,
+            last_activity = strftime('%%Y-%%m-%%d %%H:%%M:%%f', 'now')
+        WHERE user_id = old.owner_id;
+    END
+    """,
+)
+
+for _statement in TASKS_FTS_DDL + TASKS_VERSION_DDL + TASKS_STATS_DDL:
+    event.listen(Task.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(
+    Task.__table__,
+    "before_drop",
+    DDL("DROP TABLE IF EXISTS tasks_fts").execute_if(dialect="sqlite"),
+)
+
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id = Column(Integer, primary_key=True)
     token_hash = Column(String, unique=True, nullable=False)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    expires_at = Column(DateTime, nullable=False)
-    revoked_at = Column(DateTime, nullable=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    family_id = Column(String, nullable=True, index=True)
 
     user = relationship("User")
 
 
-def create_user(db, email: str, password: str, permissions: str):
-    user = User(email=email, password=hash_password(password), permissions=permissions)
+class RevokedAccessToken(Base):
+    __tablename__ = "revoked_access_tokens"
+
+    jti = Column(String, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    revoked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+def create_user(db, email: str, password_hash: str, permissions: str):
+    user = User(email=email, password=password_hash, permissions=permissions)
     db.add(user)
     db.commit()
     db.refresh(user)
@@ -0,0 +1,108 @@
+import hashlib
+import heapq
+import threading
+import time
+from typing import Iterable, Tuple
+
+
+class BloomFilter:
+    def __init__(self, bits: int, hashes: int):
+        self.bits = max(bits, 8)
+        self.hashes = hashes
+        self._array = bytearray((self.bits + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hashes):
+            yield (first + i * second) % self.bits
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._array[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class AccessTokenDenylist:
+    def __init__(self, bloom_bits: int, bloom_hashes: int):
+        self.bloom_bits = bloom_bits
+        self.bloom_hashes = bloom_hashes
+        self.loaded = False
+        self.bloom_rejections = 0
+        self.false_positives = 0
+        self.denied = 0
+        self.evictions = 0
+        self._bloom = BloomFilter(bloom_bits, bloom_hashes)
+        self._stale = 0
+        self._entries: dict[str, float] = {}
+        self._expiry: list[Tuple[float, str]] = []
+        self._lock = threading.Lock()
+
+    def load(self, rows: Iterable[Tuple[str, float]]) -> None:
+        with self._lock:
+            if self.loaded:
+                return
+            for jti, expires_at in rows:
+                self._add(jti, expires_at)
+            self.loaded = True
+
+    def add(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            self._add(jti, expires_at)
+
+    def _add(self, jti: str, expires_at: float) -> None:
+        if jti not in self._entries:
+            heapq.heappush(self._expiry, (expires_at, jti))
+        self._entries[jti] = expires_at
+        self._bloom.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        if jti not in self._bloom:
+            self.bloom_rejections += 1
+            return False
+        with self._lock:
+            self._evict_expired(time.time())
+            if jti in self._entries:
+                self.denied += 1
+                return True
+            self.false_positives += 1
+            return False
+
+    def _evict_expired(self, now: float) -> None:
+        while self._expiry and self._expiry[0][0] <= now:
+            _, jti = heapq.heappop(self._expiry)
+            del self._entries[jti]
+            self.evictions += 1
+            self._stale += 1
+        # из Bloom-фильтра удалять нельзя — пересобираем, когда протухших больше живых
+        if self._stale > len(self._entries):
+            self._bloom = BloomFilter(self.bloom_bits, self.bloom_hashes)
+            for jti in self._entries:
+                self._bloom.add(jti)
+            self._stale = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bloom = BloomFilter(self.bloom_bits, self.bloom_hashes)
+            self._entries.clear()
+            self._expiry.clear()
+            self._stale = 0
+            self.loaded = False
+            self.bloom_rejections = 0
+            self.false_positives = 0
+            self.denied = 0
+            self.evictions = 0
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._entries),
+            "loaded": self.loaded,
+            "bloom_bits": self.bloom_bits,
+            "bloom_rejections": self.bloom_rejections,
+            "false_positives": self.false_positives,
+            "denied": self.denied,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,44 @@
+import csv
+import io
+import json
+from typing import Iterable, Iterator
+
+from sqlalchemy.engine import Row
+
+from task_queries import TASK_COLUMNS
+
+EXPORT_FIELDS = [column.key for column in TASK_COLUMNS]
+
+
+def _json_default(value):
+    return value.isoformat()
+
+
+def iter_ndjson(rows: Iterable[Row], chunk_rows: int = 500) -> Iterator[str]:
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps(row._asdict(), default=_json_default, ensure_ascii=False))
+        if len(buffer) >= chunk_rows:
+            yield "\n".join(buffer) + "\n"
+            buffer.clear()
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def iter_csv(rows: Iterable[Row], chunk_rows: int = 500) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    pending = 0
+    for row in rows:
+        writer.writerow(
+            value.isoformat() if hasattr(value, "isoformat") else value
+            for value in row
+        )
+        pending += 1
+        if pending >= chunk_rows:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
@@ -0,0 +1,15 @@
+import time
+
+from database import engine, DATABASE_URL
+from token_gc import sweep_refresh_tokens
+
+
+def main() -> None:
+    print(f"Sweeping refresh tokens at: {DATABASE_URL}")
+    started = time.perf_counter()
+    deleted = sweep_refresh_tokens(engine)
+    print(f"Done. {deleted} tokens deleted in {time.perf_counter() - started:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
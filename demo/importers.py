@@ -0,0 +1,61 @@
+import csv
+import json
+from typing import BinaryIO, Iterator, Union
+
+from pydantic import ValidationError
+
+from schemas import TaskIn
+
+ImportRecord = tuple[int, Union[dict, str]]
+
+
+def _utf8_lines(stream: BinaryIO) -> Iterator[str]:
+    for line in stream:
+        yield line.decode("utf-8")
+
+
+def _decode_error(exc: UnicodeDecodeError) -> str:
+    return f"Invalid UTF-8: {exc.reason} at byte {exc.start}"
+
+
+def iter_ndjson_records(stream: BinaryIO) -> Iterator[ImportRecord]:
+    for line_number, raw in enumerate(stream, start=1):
+        try:
+            line = raw.decode("utf-8")
+        except UnicodeDecodeError as exc:
+            yield line_number, _decode_error(exc)
+            continue
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield line_number, f"Invalid JSON: {exc}"
+            continue
+        if not isinstance(record, dict):
+            yield line_number, "Expected a JSON object"
+            continue
+        yield line_number, record
+
+
+def iter_csv_records(stream: BinaryIO) -> Iterator[ImportRecord]:
+    reader = csv.DictReader(_utf8_lines(stream))
+    try:
+        for row in reader:
+            yield reader.line_num, {key: value for key, value in row.items() if value != ""}
+    except UnicodeDecodeError as exc:
+        # строки декодируются по одной, так что сломалась следующая за прочитанными;
+        # дальше CSV разбирать нельзя — поле могло начаться в битой строке
+        yield reader.line_num + 1, _decode_error(exc)
+
+
+def validate_record(record: Union[dict, str]) -> Union[TaskIn, str]:
+    if isinstance(record, str):
+        return record
+    try:
+        return TaskIn.model_validate(record)
+    except ValidationError as exc:
+        return "; ".join(
+            f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}"
+            for error in exc.errors()
+        )
@@ -1,40 +1,104 @@
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
+from typing import Optional
 from uuid import uuid4
 import hashlib
+import time
 from jose import jwt, JWTError
 from fastapi import Depends, HTTPException, Request
 from fastapi.security import HTTPBearer
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import User, RefreshToken
-from dependencies import get_db
-from config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES
+from cache import TTLCache
+from database import User, RefreshToken, RevokedAccessToken
+from denylist import AccessTokenDenylist
+from metrics import refresh_rotated, refresh_reuse_detected
+from dependencies import get_db, get_async_db
+from config import (
+    SECRET_KEY,
+    ALGORITHM,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    PRINCIPAL_CACHE_SIZE,
+    PRINCIPAL_CACHE_TTL_SECONDS,
+    VERIFIED_TOKEN_CACHE_SIZE,
+    ACCESS_DENYLIST_BLOOM_BITS,
+    ACCESS_DENYLIST_BLOOM_HASHES,
+)
 
 oauth2_scheme = HTTPBearer(auto_error=False)
 
 
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    permissions: str
+
+
+principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_SIZE, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+verified_token_cache = TTLCache(
+    maxsize=VERIFIED_TOKEN_CACHE_SIZE,
+    ttl=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+)
+access_denylist = AccessTokenDenylist(ACCESS_DENYLIST_BLOOM_BITS, ACCESS_DENYLIST_BLOOM_HASHES)
+
+
+def invalidate_principal(user_id: int) -> None:
+    principal_cache.invalidate(user_id)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_changed_user(mapper, connection, target):
+    invalidate_principal(target.id)
+
+
 def create_access_token(data: dict, expires_minutes: int = ACCESS_TOKEN_EXPIRE_MINUTES):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(minutes=expires_minutes)
     to_encode.update({"exp": expire, "type": "access", "jti": str(uuid4())})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def create_refresh_token(data: dict, expires_days: int = 7):
+def issue_refresh_token(data: dict, expires_days: int = 7) -> tuple[str, datetime]:
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=expires_days)
     to_encode.update({"exp": expire, "type": "refresh", "jti": str(uuid4())})
-    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM), expire
+
+def create_refresh_token(data: dict, expires_days: int = 7):
+    return issue_refresh_token(data, expires_days)[0]
 
 
-def get_current_user(
-    request: Request,
-    token=Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-):
+def decode_refresh_token(token: str) -> int:
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        if payload.get("type") != "refresh":
+            raise HTTPException(status_code=401, detail="Invalid token type")
+        user_id = payload.get("id")
+        if not user_id:
+            raise HTTPException(status_code=401, detail="Invalid token")
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return user_id
+
+
+def verify_access_token(access_token: str) -> dict:
+    # один и тот же токен приходит сотни раз — подпись проверяем один раз до exp
+    key = hashlib.blake2b(access_token.encode("utf-8"), digest_size=16).digest()
+    payload = verified_token_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
+        verified_token_cache.set(key, payload, ttl=payload.get("exp", 0) - time.time())
+    return payload
+
+
+def decode_access_token(request: Request, token) -> int:
     access_token = token.credentials if token else request.cookies.get("access_token")
     if not access_token:
         raise HTTPException(status_code=401, detail="Missing access token")
     try:
-        payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = verify_access_token(access_token)
         token_type = payload.get("type")
         if token_type != "access":
             raise HTTPException(status_code=401, detail="Invalid token type")
@@ -43,34 +107,193 @@ def get_current_user(
             raise HTTPException(status_code=401, detail="Invalid token")
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    jti = payload.get("jti")
+    if jti and access_denylist.is_revoked(jti):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return user_id
 
-    user = db.query(User).filter(User.id == user_id).first()
+
+def revoked_access_tokens_statement(now: datetime):
+    return select(RevokedAccessToken.jti, RevokedAccessToken.expires_at).where(
+        RevokedAccessToken.expires_at > now
+    )
+
+
+def _denylist_rows(rows):
+    for jti, expires_at in rows:
+        yield jti, expires_at.replace(tzinfo=timezone.utc).timestamp()
+
+
+def load_access_denylist(db: Session) -> None:
+    if not access_denylist.loaded:
+        rows = db.execute(revoked_access_tokens_statement(datetime.now(timezone.utc)))
+        access_denylist.load(_denylist_rows(rows))
+
+
+async def load_access_denylist_async(db: AsyncSession) -> None:
+    if not access_denylist.loaded:
+        rows = await db.execute(revoked_access_tokens_statement(datetime.now(timezone.utc)))
+        access_denylist.load(_denylist_rows(rows))
+
+
+def access_token_claims(request: Request, token) -> Optional[dict]:
+    access_token = token.credentials if token else request.cookies.get("access_token")
+    if not access_token:
+        return None
+    try:
+        payload = jwt.decode(access_token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    if payload.get("type") != "access" or not payload.get("jti") or not payload.get("id"):
+        return None
+    return payload
+
+
+def revoke_access_token_insert(claims: dict):
+    return (
+        insert(RevokedAccessToken)
+        .values(
+            jti=claims["jti"],
+            user_id=claims["id"],
+            expires_at=datetime.fromtimestamp(claims["exp"], tz=timezone.utc),
+            revoked_at=datetime.now(timezone.utc),
+        )
+        .prefix_with("OR IGNORE", dialect="sqlite")
+    )
+
+
+def revoke_access_token(db: Session, claims: dict) -> None:
+    db.execute(revoke_access_token_insert(claims))
+    db.commit()
+    access_denylist.add(claims["jti"], claims["exp"])
+
+
+def _cache_principal(user_id: int, user: User) -> Principal:
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
 
-    return user
+    principal = Principal(id=user.id, email=user.email, permissions=user.permissions)
+    principal_cache.set(user_id, principal)
+    return principal
+
+
+def get_current_user(
+    request: Request,
+    token=Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    load_access_denylist(db)
+    user_id = decode_access_token(request, token)
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = db.query(User).filter(User.id == user_id).first()
+    return _cache_principal(user_id, user)
+
+
+async def get_current_user_async(
+    request: Request,
+    token=Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await load_access_denylist_async(db)
+    user_id = decode_access_token(request, token)
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
+    return _cache_principal(user_id, user)
 
 
 def hash_refresh_token(token: str) -> str:
     return hashlib.sha256(token.encode("utf-8")).hexdigest()
 
 
-def store_refresh_token(db: Session, user_id: int, token: str, expires_at: datetime) -> RefreshToken:
-    token_hash = hash_refresh_token(token)
-    refresh = RefreshToken(
-        token_hash=token_hash,
+def new_token_family() -> str:
+    return uuid4().hex
+
+
+def refresh_token_insert(user_id: int, token: str, expires_at: datetime, family_id: str):
+    return insert(RefreshToken).values(
+        token_hash=hash_refresh_token(token),
         user_id=user_id,
-        expires_at=expires_at
+        expires_at=expires_at,
+        family_id=family_id,
+        created_at=datetime.now(timezone.utc),
+    )
+
+
+def claim_refresh_token_statement(token: str, user_id: int, now: datetime):
+    return (
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_refresh_token(token),
+            RefreshToken.user_id == user_id,
+            RefreshToken.revoked_at.is_(None),
+            RefreshToken.expires_at > now,
+        )
+        .values(revoked_at=now)
+        .returning(RefreshToken.family_id)
+    )
+
+
+def revoke_reused_family_statement(token: str, now: datetime):
+    reused_family = (
+        select(RefreshToken.family_id)
+        .where(
+            RefreshToken.token_hash == hash_refresh_token(token),
+            RefreshToken.revoked_at.is_not(None),
+        )
+        .scalar_subquery()
     )
-    db.add(refresh)
+    return (
+        update(RefreshToken)
+        .where(RefreshToken.family_id == reused_family, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=now)
+    )
+
+
+def revoke_refresh_token_statement(token: str, now: datetime):
+    return (
+        update(RefreshToken)
+        .where(
+            RefreshToken.token_hash == hash_refresh_token(token),
+            RefreshToken.revoked_at.is_(None),
+        )
+        .values(revoked_at=now)
+    )
+
+
+def store_refresh_token(
+    db: Session,
+    user_id: int,
+    token: str,
+    expires_at: datetime,
+    family_id: Optional[str] = None,
+) -> None:
+    db.execute(refresh_token_insert(user_id, token, expires_at, family_id or new_token_family()))
+    db.commit()
+
+
+def rotate_refresh_token(db: Session, token: str, user_id: int) -> tuple[str, str]:
+    now = datetime.now(timezone.utc)
+    family_id = db.execute(claim_refresh_token_statement(token, user_id, now)).scalar()
+    if family_id is None:
+        db.execute(revoke_reused_family_statement(token, now))
+        db.commit()
+        refresh_reuse_detected.inc()
+        raise HTTPException(status_code=401, detail="Refresh token revoked")
+
+    new_access = create_access_token({"id": user_id})
+    new_refresh, expires_at = issue_refresh_token({"id": user_id})
+    db.execute(refresh_token_insert(user_id, new_refresh, expires_at, family_id))
     db.commit()
-    db.refresh(refresh)
-    return refresh
+    refresh_rotated.inc()
+    return new_access, new_refresh
 
 
 def revoke_refresh_token(db: Session, token: str) -> None:
-    token_hash = hash_refresh_token(token)
-    refresh = db.query(RefreshToken).filter(RefreshToken.token_hash == token_hash).first()
-    if refresh and refresh.revoked_at is None:
-        refresh.revoked_at = datetime.now(timezone.utc)
-        db.commit()
\ No newline at end of file
+    db.execute(revoke_refresh_token_statement(token, datetime.now(timezone.utc)))
+    db.commit()
\ No newline at end of file
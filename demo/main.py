@@ -1,34 +1,139 @@
-from datetime import datetime, timezone
-from typing import Optional
-
-from fastapi import FastAPI, Depends, HTTPException, Query, Request, Form
-from fastapi.responses import HTMLResponse
+import asyncio
+import time
+from contextlib import asynccontextmanager, suppress
+from datetime import datetime
+from typing import Literal, Optional
+
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, Form, File, UploadFile
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from jose import jwt, JWTError
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from starlette.responses import RedirectResponse
 
-from config import SECRET_KEY, ALGORITHM
-from database import create_user, get_user_by_email, verify_password, User, Task, RefreshToken
+from config import (
+    PATH_TASK_PAGE_SIZE,
+    REFRESH_TOKEN_GC_INTERVAL_SECONDS,
+    TASK_BATCH_MAX_ITEMS,
+    TASK_IMPORT_CHUNK_SIZE,
+    TASK_IMPORT_MAX_ERRORS,
+)
+from database import (
+    DB_MODE,
+    engine,
+    create_user,
+    get_user_by_email,
+    hash_password_async,
+    verify_and_update_password_async,
+    PasswordHasherBusy,
+    User,
+    Task,
+)
+from conditional import cache_headers, check_if_match, list_etag, not_modified, task_etag
 from dependencies import get_db
+from exporters import iter_csv, iter_ndjson
+from importers import iter_csv_records, iter_ndjson_records, validate_record
 from jwt_manager import (
+    access_denylist,
+    access_token_claims,
     create_access_token,
-    create_refresh_token,
+    decode_refresh_token,
     get_current_user,
-    hash_refresh_token,
+    issue_refresh_token,
+    oauth2_scheme,
+    principal_cache,
+    revoke_access_token,
+    rotate_refresh_token,
     store_refresh_token,
     revoke_refresh_token,
+    verified_token_cache,
 )
+from metrics import MetricsMiddleware, login_failed, login_succeeded, registry
+from pagination import paginate
 from permissions import init_permissions_by_role, check_permission
-from schemas import Registration, Login, TaskOut, TaskUpdate, TaskIn, RefreshRequest
+from profiler import ProfilerMiddleware, profiler_state
+from schemas import (
+    Registration,
+    Login,
+    TaskOut,
+    TaskUpdate,
+    TaskIn,
+    RefreshRequest,
+    TaskBatchUpdate,
+    TaskBatchDelete,
+    TaskBatchResult,
+    TaskSearchResult,
+    TaskStats,
+    ProfilerConfig,
+)
+from serializers import json_response, sparse_records, task_records
+from sql_timing import QueryStatsMiddleware
+from task_queries import (
+    TASK_COLUMNS,
+    overdue_count_statement,
+    parse_fields,
+    task_stats_statement,
+    task_export_statement,
+    task_list_statement,
+    task_search_statement,
+    task_version_statement,
+    tasks_version_statement,
+)
+from token_gc import run_refresh_token_gc, sweep_stats
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    sweeper = None
+    if REFRESH_TOKEN_GC_INTERVAL_SECONDS > 0:
+        sweeper = asyncio.create_task(run_refresh_token_gc(engine))
+    yield
+    if sweeper:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(QueryStatsMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ProfilerMiddleware)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
 
+@app.exception_handler(PasswordHasherBusy)
+def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many login attempts in progress, try again later"},
+        headers={"Retry-After": "1"},
+    )
+
+
+async def check_credentials(db: Session, email: str, password: str) -> Optional[User]:
+    user = get_user_by_email(db, email)
+    if not user:
+        return None
+    is_valid, new_hash = await verify_and_update_password_async(password, user.password)
+    if not is_valid:
+        return None
+    if new_hash:
+        user.password = new_hash
+        db.commit()
+    return user
+
+
+async def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
+    started = time.perf_counter()
+    user = await check_credentials(db, email, password)
+    (login_succeeded if user else login_failed).observe(time.perf_counter() - started)
+    return user
+
+
 @app.get("/login", response_class=HTMLResponse)
 def login_page(request: Request):
     return templates.TemplateResponse(
@@ -53,21 +158,34 @@ def registration_page(request: Request):
     )
 
 
+def get_task_counts(db: Session, owner_id: int) -> tuple[int, int, Optional[datetime]]:
+    # одна строка user_task_stats — этого хватает страницам, которым не нужен overdue
+    row = db.execute(task_stats_statement(owner_id)).first()
+    return tuple(row) if row else (0, 0, None)
+
+
+def get_task_stats(db: Session, owner_id: int) -> TaskStats:
+    total, done, last_activity = get_task_counts(db, owner_id)
+    overdue = db.execute(overdue_count_statement(owner_id, datetime.utcnow())).scalar_one()
+    return TaskStats(
+        total=total,
+        done=done,
+        active=total - done,
+        overdue=overdue,
+        last_activity=last_activity,
+    )
+
+
 @app.get("/path_task", response_class=HTMLResponse)
 def path_task(
     request: Request,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    tasks = (
-        db.query(Task)
-        .filter(Task.owner_id == current_user.id)
-        .order_by(Task.created_at.desc())
-        .all()
-    )
-
-    total = len(tasks)
-    done_count = len([t for t in tasks if t.is_done])
+    total, done, _ = get_task_counts(db, current_user.id)
+    statement = task_list_statement(current_user.id, limit=PATH_TASK_PAGE_SIZE + 1, cursor=cursor)
+    tasks, cursor_value = paginate(db.execute(statement).all(), PATH_TASK_PAGE_SIZE)
 
     return templates.TemplateResponse(
         "path_task.html",
@@ -76,7 +194,9 @@ def path_task(
             "current_user": current_user,
             "tasks": tasks,
             "total": total,
-            "done_count": done_count,
+            "done_count": done,
+            "cursor": cursor,
+            "next_cursor": cursor_value,
         },
     )
 
@@ -166,11 +286,13 @@ def update_task_html(
 
 
 @app.post("/registration")
-def registration(user: Registration, db: Session = Depends(get_db)):
-    if get_user_by_email(db, user.email):
+async def registration(user: Registration, db: Session = Depends(get_db)):
+    # запросы к БД остаются в пуле потоков, в пул хеширования уходит только bcrypt
+    if await run_in_threadpool(get_user_by_email, db, user.email):
         raise HTTPException(status_code=400, detail="Email already registered")
     permissions = init_permissions_by_role("user")
-    new_user = create_user(db, user.email, user.password, permissions)
+    password_hash = await hash_password_async(user.password)
+    new_user = await run_in_threadpool(create_user, db, user.email, password_hash, permissions)
     return {
         "id": new_user.id,
         "email": new_user.email,
@@ -185,14 +307,12 @@ async def login(request: Request, db: Session = Depends(get_db)):
     if "application/json" in content_type:
         body = await request.json()
         payload = Login(**body)
-        user = get_user_by_email(db, payload.email)
-        if not user or not verify_password(payload.password, user.password):
+        user = await authenticate_user(db, payload.email, payload.password)
+        if not user:
             raise HTTPException(status_code=400, detail="Invalid credentials")
 
         access_token = create_access_token({"id": user.id})
-        refresh_token = create_refresh_token({"id": user.id})
-        refresh_payload = jwt.decode(refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        expires_at = datetime.fromtimestamp(refresh_payload["exp"], tz=timezone.utc)
+        refresh_token, expires_at = issue_refresh_token({"id": user.id})
         store_refresh_token(db, user.id, refresh_token, expires_at)
 
         return {
@@ -207,8 +327,8 @@ async def login(request: Request, db: Session = Depends(get_db)):
     if not email or not password:
         raise HTTPException(status_code=422, detail="Email and password are required")
 
-    user = get_user_by_email(db, email)
-    if not user or not verify_password(password, user.password):
+    user = await authenticate_user(db, email, password)
+    if not user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
 
     access_token = create_access_token({"id": user.id})
@@ -224,14 +344,19 @@ async def login(request: Request, db: Session = Depends(get_db)):
 
 
 @app.get("/navbooks", response_class=HTMLResponse)
-def navbooks(request: Request, current_user: User = Depends(get_current_user)):
+def navbooks(
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    total, done, _ = get_task_counts(db, current_user.id)
     return templates.TemplateResponse(
         "navbooks.html",
         {
             "request": request,
             "user": current_user.email,
-            "total": 0,
-            "done_count": 0,
+            "total": total,
+            "done_count": done,
             "tasks": [],
         },
     )
@@ -239,27 +364,8 @@ def navbooks(request: Request, current_user: User = Depends(get_current_user)):
 
 @app.post("/token/refresh")
 def refresh_token(request: RefreshRequest, db: Session = Depends(get_db)):
-    try:
-        payload = jwt.decode(request.refresh_token, SECRET_KEY, algorithms=[ALGORITHM])
-        if payload.get("type") != "refresh":
-            raise HTTPException(status_code=401, detail="Invalid token type")
-        user_id = payload.get("id")
-        if not user_id:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-    token_hash = hash_refresh_token(request.refresh_token)
-    stored = db.query(RefreshToken).filter(RefreshToken.token_hash == token_hash).first()
-    if not stored or stored.revoked_at is not None:
-        raise HTTPException(status_code=401, detail="Refresh token revoked")
-
-    revoke_refresh_token(db, request.refresh_token)
-    new_access = create_access_token({"id": user_id})
-    new_refresh = create_refresh_token({"id": user_id})
-    new_payload = jwt.decode(new_refresh, SECRET_KEY, algorithms=[ALGORITHM])
-    new_expires_at = datetime.fromtimestamp(new_payload["exp"], tz=timezone.utc)
-    store_refresh_token(db, user_id, new_refresh, new_expires_at)
+    user_id = decode_refresh_token(request.refresh_token)
+    new_access, new_refresh = rotate_refresh_token(db, request.refresh_token, user_id)
 
     return {
         "access_token": new_access,
@@ -269,15 +375,26 @@ def refresh_token(request: RefreshRequest, db: Session = Depends(get_db)):
 
 
 @app.post("/logout")
-def logout_api(payload: Optional[RefreshRequest] = None, db: Session = Depends(get_db)):
+def logout_api(
+    request: Request,
+    payload: Optional[RefreshRequest] = None,
+    token=Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+):
     if payload and payload.refresh_token:
         revoke_refresh_token(db, payload.refresh_token)
+    claims = access_token_claims(request, token)
+    if claims:
+        revoke_access_token(db, claims)
     response = {"status": "logged out"}
     return response
 
 
 @app.get("/logout")
-def logout_page():
+def logout_page(request: Request, db: Session = Depends(get_db)):
+    claims = access_token_claims(request, None)
+    if claims:
+        revoke_access_token(db, claims)
     response = RedirectResponse(url="/login", status_code=302)
     response.delete_cookie("access_token")
     return response
@@ -302,6 +419,35 @@ def admin_only(current_user: User = Depends(check_permission("admin.panel"))):
     return {"message": "Admin access granted"}
 
 
+@app.get("/admin/profiler")
+def profiler_status(current_user: User = Depends(check_permission("admin.panel"))):
+    return profiler_state.status()
+
+
+@app.post("/admin/profiler")
+def configure_profiler(
+    config: ProfilerConfig,
+    current_user: User = Depends(check_permission("admin.panel")),
+):
+    profiler_state.configure(config.enabled, config.sample_rate, config.path_prefix, config.interval_ms)
+    return profiler_state.status()
+
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/admin/stats")
+def admin_stats(current_user: User = Depends(check_permission("admin.panel"))):
+    return {
+        "principal_cache": principal_cache.stats(),
+        "verified_token_cache": verified_token_cache.stats(),
+        "access_denylist": access_denylist.stats(),
+        "refresh_token_gc": sweep_stats.snapshot(),
+    }
+
+
 @app.post("/tasks", response_model=TaskOut)
 def create_task(
     task: TaskIn,
@@ -322,53 +468,230 @@ def create_task(
 
 @app.get("/tasks", response_model=list[TaskOut])
 def get_tasks(
+    request: Request,
     is_done: Optional[bool] = None,
     due_before: Optional[datetime] = None,
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(check_permission("task.read")),
 ):
-    query = db.query(Task).filter(Task.owner_id == current_user.id)
-    if is_done is not None:
-        query = query.filter(Task.is_done == is_done)
-    if due_before is not None:
-        query = query.filter(Task.due_date <= due_before)
+    selected = parse_fields(fields)
+    version, changed_at = db.execute(tasks_version_statement(current_user.id)).one()
+    etag = list_etag(current_user.id, version, request)
+    cached = not_modified(request, etag, changed_at)
+    if cached:
+        return cached
+
+    statement = task_list_statement(current_user.id, is_done, due_before, limit + 1, offset, cursor, selected)
+    tasks, cursor_value = paginate(db.execute(statement).all(), limit)
+    headers = cache_headers(etag, changed_at)
+    if cursor_value:
+        headers["X-Next-Cursor"] = cursor_value
+    # строки Core сериализуются напрямую, response_model остаётся только для схемы OpenAPI
+    if selected is not None:
+        return json_response(sparse_records(tasks, selected), headers)
+    return json_response(task_records(tasks), headers)
+
+
+@app.get("/tasks/export")
+def export_tasks(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    is_done: Optional[bool] = None,
+    due_before: Optional[datetime] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(check_permission("task.read")),
+):
+    rows = db.execute(task_export_statement(current_user.id, is_done, due_before))
+    if format == "csv":
+        body, media_type = iter_csv(rows), "text/csv"
+    else:
+        body, media_type = iter_ndjson(rows), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="tasks.{format}"'},
+    )
 
-    tasks = query.order_by(Task.created_at.desc()).offset(offset).limit(limit).all()
-    return tasks
 
+def check_batch_size(items: list) -> None:
+    if not items:
+        raise HTTPException(status_code=422, detail="Batch is empty")
+    if len(items) > TASK_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"Batch is limited to {TASK_BATCH_MAX_ITEMS} items",
+        )
+
+
+def resolve_batch_ownership(db: Session, task_ids: list[int], owner_id: int) -> tuple[set, dict]:
+    owners = dict(db.execute(select(Task.id, Task.owner_id).where(Task.id.in_(task_ids))).all())
+    owned = set()
+    rejected = {}
+    for task_id in task_ids:
+        if task_id not in owners:
+            rejected[task_id] = "not_found"
+        elif owners[task_id] != owner_id:
+            rejected[task_id] = "forbidden"
+        else:
+            owned.add(task_id)
+    return owned, rejected
+
+
+@app.post("/tasks/batch", response_model=list[TaskBatchResult])
+def create_tasks_batch(
+    tasks: list[TaskIn],
+    db: Session = Depends(get_db),
+    current_user: User = Depends(check_permission("task.create")),
+):
+    check_batch_size(tasks)
+    rows = [{**task.model_dump(), "owner_id": current_user.id} for task in tasks]
+    # Core-вставка одним INSERT ... RETURNING: строки не истекают при commit, повторных SELECT нет
+    created = db.execute(insert(Task.__table__).returning(*TASK_COLUMNS), rows).all()
+    db.commit()
+    created.sort(key=lambda task: task.id)
+    return [TaskBatchResult(id=task.id, status="created", task=task) for task in created]
 
-@app.patch("/tasks/{task_id}", response_model=TaskOut)
-def update_task_api(
-    task_id: int,
-    task_data: TaskUpdate,
+
+@app.patch("/tasks/batch", response_model=list[TaskBatchResult])
+def update_tasks_batch(
+    items: list[TaskBatchUpdate],
     db: Session = Depends(get_db),
     current_user: User = Depends(check_permission("task.update")),
 ):
+    check_batch_size(items)
+    owned, rejected = resolve_batch_ownership(db, [item.id for item in items], current_user.id)
+
+    changes = [
+        {"id": item.id, **item.model_dump(exclude_unset=True, exclude={"id"})}
+        for item in items
+        if item.id in owned
+    ]
+    changes = [change for change in changes if len(change) > 1]
+    if changes:
+        db.execute(update(Task), changes)
+    db.commit()
+
+    tasks = {task.id: task for task in db.scalars(select(Task).where(Task.id.in_(owned)))}
+    return [
+        TaskBatchResult(id=item.id, status=rejected[item.id])
+        if item.id in rejected
+        else TaskBatchResult(id=item.id, status="updated", task=tasks[item.id])
+        for item in items
+    ]
+
+
+@app.delete("/tasks/batch", response_model=list[TaskBatchResult])
+def delete_tasks_batch(
+    payload: TaskBatchDelete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(check_permission("task.delete")),
+):
+    check_batch_size(payload.ids)
+    owned, rejected = resolve_batch_ownership(db, payload.ids, current_user.id)
+    if owned:
+        db.execute(delete(Task).where(Task.id.in_(owned)))
+    db.commit()
+    return [
+        TaskBatchResult(id=task_id, status=rejected.get(task_id, "deleted"))
+        for task_id in payload.ids
+    ]
+
+
+@app.get("/tasks/stats", response_model=TaskStats)
+def task_stats(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(check_permission("task.read")),
+):
+    return get_task_stats(db, current_user.id)
+
+
+@app.get("/tasks/search", response_model=list[TaskSearchResult])
+def search_tasks(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(check_permission("task.read")),
+):
+    return db.execute(task_search_statement(current_user.id, q, limit, offset)).mappings().all()
+
+
+@app.post("/tasks/import")
+def import_tasks(
+    file: UploadFile = File(...),
+    format: Literal["ndjson", "csv"] = "ndjson",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(check_permission("task.create")),
+):
+    records = iter_csv_records(file.file) if format == "csv" else iter_ndjson_records(file.file)
+    imported = 0
+    failed = 0
+    errors = []
+    chunk = []
+
+    def flush():
+        nonlocal imported
+        db.execute(insert(Task), chunk)
+        db.commit()
+        imported += len(chunk)
+        chunk.clear()
+
+    for line_number, record in records:
+        task = validate_record(record)
+        if isinstance(task, str):
+            failed += 1
+            if len(errors) < TASK_IMPORT_MAX_ERRORS:
+                errors.append({"line": line_number, "error": task})
+            continue
+        chunk.append({**task.model_dump(), "owner_id": current_user.id})
+        if len(chunk) >= TASK_IMPORT_CHUNK_SIZE:
+            flush()
+    if chunk:
+        flush()
+
+    return {"imported": imported, "failed": failed, "errors": errors}
+
+
+def get_owned_task(db: Session, task_id: int, owner_id: int) -> Task:
     task = db.query(Task).filter(Task.id == task_id).first()
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
-    if task.owner_id != current_user.id:
+    if task.owner_id != owner_id:
         raise HTTPException(status_code=403, detail="Not your task")
+    return task
+
+
+@app.patch("/tasks/{task_id}", response_model=TaskOut)
+def update_task_api(
+    task_id: int,
+    task_data: TaskUpdate,
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(check_permission("task.update")),
+):
+    task = get_owned_task(db, task_id, current_user.id)
+    check_if_match(request, task_etag(task.id, task.updated_at))
     for field, value in task_data.model_dump(exclude_unset=True).items():
         setattr(task, field, value)
     db.commit()
     db.refresh(task)
+    response.headers.update(cache_headers(task_etag(task.id, task.updated_at), task.updated_at))
     return task
 
 
 @app.delete("/tasks/{task_id}")
 def delete_task(
     task_id: int,
+    request: Request,
     db: Session = Depends(get_db),
     current_user: User = Depends(check_permission("task.delete")),
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if task.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not your task")
+    task = get_owned_task(db, task_id, current_user.id)
+    check_if_match(request, task_etag(task.id, task.updated_at))
     db.delete(task)
     db.commit()
     return {"status": "deleted"}
@@ -377,12 +700,33 @@ def delete_task(
 @app.get("/tasks/{task_id}", response_model=TaskOut)
 def get_task(
     task_id: int,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(check_permission("task.read")),
 ):
-    task = db.query(Task).filter(Task.id == task_id).first()
-    if not task:
-        raise HTTPException(status_code=404, detail="Task not found")
-    if task.owner_id != current_user.id:
-        raise HTTPException(status_code=403, detail="Not your task")
+    selected = parse_fields(fields)
+    if selected or request.headers.get("if-none-match"):
+        row = db.execute(task_version_statement(task_id, selected or ())).first()
+        if not row:
+            raise HTTPException(status_code=404, detail="Task not found")
+        if row.owner_id != current_user.id:
+            raise HTTPException(status_code=403, detail="Not your task")
+        etag = task_etag(task_id, row.updated_at, selected or ())
+        cached = not_modified(request, etag, row.updated_at)
+        if cached:
+            return cached
+        if selected:
+            # урезанное представление: в выборку попали только запрошенные колонки
+            return json_response(sparse_records([row], selected)[0], cache_headers(etag, row.updated_at))
+
+    task = get_owned_task(db, task_id, current_user.id)
+    response.headers.update(cache_headers(task_etag(task.id, task.updated_at), task.updated_at))
     return task
+
+
+if DB_MODE == "async":
+    from async_api import install_async_routes
+
+    install_async_routes(app)
@@ -0,0 +1,325 @@
+import bisect
+import threading
+import time
+import weakref
+from typing import Callable, Iterable, Optional
+
+from sqlalchemy import event
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class _Slot:
+    __slots__ = ("values", "__weakref__")
+
+    def __init__(self, values: list[float]):
+        self.values = values
+
+
+class _Shards:
+    # у каждого потока свои ячейки — инкременты без блокировок, суммируем при сборе
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._shards: list[list[float]] = []
+        # вклад завершившихся потоков: пул AnyIO пересоздаёт рабочие потоки
+        self._retired = [0.0] * size
+        self._lock = threading.Lock()
+
+    def get(self) -> list[float]:
+        try:
+            return self._local.slot.values
+        except AttributeError:
+            values = [0.0] * self.size
+            slot = _Slot(values)
+            with self._lock:
+                self._shards.append(values)
+            # thread-local слот освобождается вместе с потоком — тогда и сворачиваем его ячейки
+            weakref.finalize(slot, self._retire, values)
+            self._local.slot = slot
+            return values
+
+    def _retire(self, values: list[float]) -> None:
+        with self._lock:
+            for i, value in enumerate(values):
+                self._retired[i] += value
+            self._shards = [shard for shard in self._shards if shard is not values]
+
+    def totals(self) -> list[float]:
+        with self._lock:
+            totals = list(self._retired)
+            for values in self._shards:
+                for i, value in enumerate(values):
+                    totals[i] += value
+        return totals
+
+
+class CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._shards.get()[0] += amount
+
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+
+class GaugeChild(CounterChild):
+    def dec(self, amount: float = 1.0) -> None:
+        self._shards.get()[0] -= amount
+
+
+class HistogramChild:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        # по ячейке на бакет, ещё одна на +Inf и последняя под сумму
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        values = self._shards.get()
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def time(self):
+        return _Timer(self)
+
+    def snapshot(self) -> tuple[list[float], float]:
+        totals = self._shards.totals()
+        return totals[:-1], totals[-1]
+
+
+class _Timer:
+    def __init__(self, histogram: HistogramChild):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started)
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self.labels()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _label_text(self, values: tuple, extra: Optional[tuple] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default.inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{self._label_text(values)} {child.value()}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def _new_child(self):
+        return GaugeChild()
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default.dec(amount)
+
+
+class GaugeFunc(Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self._functions: dict[tuple, Callable[[], float]] = {}
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return None
+
+    def set_function(self, function: Callable[[], float], *values: str) -> None:
+        self._functions[values] = function
+
+    def _samples(self):
+        for values, function in list(self._functions.items()):
+            yield f"{self.name}{self._label_text(values)} {float(function())}"
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (), buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0.0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{self._label_text(values, ('le', le))} {cumulative}"
+            yield f"{self.name}_sum{self._label_text(values)} {total}"
+            yield f"{self.name}_count{self._label_text(values)} {cumulative}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics) + "\n"
+
+
+registry = Registry()
+
+http_requests = registry.register(
+    Counter("http_requests_total", "HTTP requests by route, method and status.", ("route", "method", "status"))
+)
+http_request_duration = registry.register(
+    Histogram("http_request_duration_seconds", "HTTP request latency by route.", ("route", "method"))
+)
+http_requests_in_flight = registry.register(
+    Gauge("http_requests_in_flight", "HTTP requests currently being served.")
+)
+db_pool_checkouts = registry.register(
+    Counter("db_pool_checkouts_total", "Connections checked out of the pool.", ("engine",))
+)
+db_pool_checked_out = registry.register(
+    GaugeFunc("db_pool_checked_out", "Connections currently checked out.", ("engine",))
+)
+db_pool_overflow = registry.register(
+    GaugeFunc("db_pool_overflow", "Connections opened above pool_size.", ("engine",))
+)
+password_hash_duration = registry.register(
+    Histogram("password_hash_duration_seconds", "bcrypt hash/verify latency.", ("operation",))
+)
+login_duration = registry.register(
+    Histogram("login_duration_seconds", "Credential check latency by outcome.", ("outcome",))
+)
+refresh_token_rotations = registry.register(
+    Counter("refresh_token_rotations_total", "Refresh token rotations by outcome.", ("outcome",))
+)
+
+login_succeeded = login_duration.labels("success")
+login_failed = login_duration.labels("failure")
+refresh_rotated = refresh_token_rotations.labels("rotated")
+refresh_reuse_detected = refresh_token_rotations.labels("reuse_detected")
+
+
+def instrument_engine(sync_engine, name: str) -> None:
+    pool = sync_engine.pool
+    checkouts = db_pool_checkouts.labels(name)
+
+    @event.listens_for(sync_engine, "checkout")
+    def _count_checkout(dbapi_connection, connection_record, connection_proxy):
+        checkouts.inc()
+
+    if hasattr(pool, "checkedout"):
+        db_pool_checked_out.set_function(pool.checkedout, name)
+    if hasattr(pool, "overflow"):
+        # QueuePool.overflow() начинается с -pool_size, пока пул не заполнен
+        db_pool_overflow.set_function(lambda: max(pool.overflow(), 0), name)
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+        # route -> method -> (счётчики по статусам, гистограмма): метки собираются один раз на маршрут
+        self._routes: dict = {}
+
+    def _route_metrics(self, route_path: str, method: str):
+        methods = self._routes.get(route_path)
+        if methods is None:
+            methods = self._routes.setdefault(route_path, {})
+        entry = methods.get(method)
+        if entry is None:
+            entry = methods.setdefault(method, ({}, http_request_duration.labels(route_path, method)))
+        return entry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            http_requests_in_flight.dec()
+            route = scope.get("route")
+            route_path = route.path if route is not None else "<unmatched>"
+            method = scope["method"]
+            statuses, duration = self._route_metrics(route_path, method)
+            counter = statuses.get(status_code)
+            if counter is None:
+                counter = statuses.setdefault(
+                    status_code, http_requests.labels(route_path, method, str(status_code))
+                )
+            counter.inc()
+            duration.observe(elapsed)
@@ -0,0 +1,30 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+
+
+def encode_cursor(created_at: datetime, task_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), task_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, task_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(created_at, str) or not isinstance(task_id, int) or isinstance(task_id, bool):
+            raise ValueError("Unexpected cursor shape")
+        return datetime.fromisoformat(created_at), task_id
+    except (ValueError, TypeError, OverflowError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(rows: list, limit: int) -> tuple[list, Optional[str]]:
+    # запрос выбирает limit + 1 строку: лишняя означает, что следующая страница существует
+    if len(rows) <= limit:
+        return rows, None
+    page = rows[:limit]
+    return page, encode_cursor(page[-1].created_at, page[-1].id)
@@ -1,5 +1,8 @@
+import sys
+from functools import lru_cache
+
 from fastapi import Depends, HTTPException
-from jwt_manager import get_current_user
+from jwt_manager import get_current_user, get_current_user_async
 from database import User
 from config import ROLE_PERMISSIONS
 
@@ -11,16 +14,76 @@ def init_permissions_by_role(role: str) -> str:
     return ",".join(perms)
 
 
-def check_permission(required_permission: str):
+@lru_cache(maxsize=1024)
+def compile_permissions(permissions: str) -> frozenset:
+    return frozenset(
+        sys.intern(permission.strip())
+        for permission in permissions.split(",")
+        if permission.strip()
+    )
+
+
+for _role in ROLE_PERMISSIONS:
+    compile_permissions(init_permissions_by_role(_role))
+
+
+def _ensure_permissions(current_user: User, required: frozenset, match_all: bool) -> None:
+    if not current_user.permissions:
+        raise HTTPException(status_code=403, detail="Permissions not set")
+
+    granted = compile_permissions(current_user.permissions)
+    if "*" in granted:
+        return
+    if match_all and required <= granted:
+        return
+    if not match_all and not required.isdisjoint(granted):
+        return
+    raise HTTPException(status_code=403, detail="Permission denied")
+
+
+def _permission_checker(required_permissions: tuple, match_all: bool):
+    required = frozenset(required_permissions)
+
     def checker(current_user: User = Depends(get_current_user)):
-        if not current_user.permissions:
-            raise HTTPException(status_code=403, detail="Permissions not set")
-
-        user_permissions = current_user.permissions.split(",")
-        if "*" in user_permissions:
-            return current_user
-        if required_permission not in user_permissions:
-            raise HTTPException(status_code=403, detail="Permission denied")
+        _ensure_permissions(current_user, required, match_all)
+        return current_user
+
+    return checker
+
+
+def _async_permission_checker(required_permissions: tuple, match_all: bool):
+    required = frozenset(required_permissions)
+
+    async def checker(current_user: User = Depends(get_current_user_async)):
+        _ensure_permissions(current_user, required, match_all)
         return current_user
 
-    return checker
\ No newline at end of file
+    return checker
+
+
+@lru_cache(maxsize=None)
+def require_all(*required_permissions: str):
+    return _permission_checker(required_permissions, match_all=True)
+
+
+@lru_cache(maxsize=None)
+def require_any(*required_permissions: str):
+    return _permission_checker(required_permissions, match_all=False)
+
+
+@lru_cache(maxsize=None)
+def require_all_async(*required_permissions: str):
+    return _async_permission_checker(required_permissions, match_all=True)
+
+
+@lru_cache(maxsize=None)
+def require_any_async(*required_permissions: str):
+    return _async_permission_checker(required_permissions, match_all=False)
+
+
+def check_permission(required_permission: str):
+    return require_all(required_permission)
+
+
+def check_permission_async(required_permission: str):
+    return require_all_async(required_permission)
\ No newline at end of file
@@ -0,0 +1,177 @@
+import hmac
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from config import (
+    PROFILER_HEADER,
+    PROFILER_HEADER_SECRET,
+    PROFILER_INTERVAL_MS,
+    PROFILER_MAX_FILES,
+    PROFILER_OUTPUT_DIR,
+)
+
+# листовые функции простаивающих потоков — такие стеки в профиль не попадают
+IDLE_FUNCTIONS = frozenset({"select", "wait", "_wait_for_tstate_lock"})
+PROFILE_HEADER = PROFILER_HEADER.lower().encode("latin-1")
+
+
+class ProfilerState:
+    def __init__(
+        self,
+        output_dir: Path,
+        header_secret: str = PROFILER_HEADER_SECRET,
+        max_files: int = PROFILER_MAX_FILES,
+    ):
+        self.enabled = False
+        self.sample_rate = 0.0
+        self.path_prefix: Optional[str] = None
+        self.interval = PROFILER_INTERVAL_MS / 1000
+        self.output_dir = output_dir
+        self.header_secret = header_secret.encode("latin-1")
+        self.max_files = max_files
+        self.profiled = 0
+        self.skipped_busy = 0
+        self.recent: list[str] = []
+        self._busy = threading.Lock()
+
+    def configure(
+        self,
+        enabled: bool,
+        sample_rate: float,
+        path_prefix: Optional[str],
+        interval_ms: float,
+    ) -> None:
+        self.sample_rate = sample_rate
+        self.path_prefix = path_prefix or None
+        self.interval = interval_ms / 1000
+        self.enabled = enabled
+
+    def wants(self, scope) -> bool:
+        if self.path_prefix and scope["path"].startswith(self.path_prefix):
+            return True
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        if not self.header_secret:
+            return False
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return hmac.compare_digest(value, self.header_secret)
+        return False
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "path_prefix": self.path_prefix,
+            "interval_ms": self.interval * 1000,
+            "output_dir": str(self.output_dir),
+            "max_files": self.max_files,
+            "header_enabled": bool(self.header_secret),
+            "profiled": self.profiled,
+            "skipped_busy": self.skipped_busy,
+            "recent": list(self.recent),
+        }
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{frame.f_globals.get('__name__', '?')}:{code.co_name}:{code.co_firstlineno}"
+
+
+class StackSampler:
+    # сэмплирует все потоки процесса: параллельные запросы тоже попадут в профиль.
+    # Корень каждого стека — имя потока, так что в flame graph они разнесены по веткам
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own or frame.f_code.co_name in IDLE_FUNCTIONS:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def _profile_filename(scope, elapsed: float) -> str:
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    slug = scope["path"].strip("/").replace("/", "_") or "root"
+    return f"{stamp}-{scope['method']}-{slug}-{elapsed * 1000:.0f}ms.folded"
+
+
+profiler_state = ProfilerState(Path(PROFILER_OUTPUT_DIR))
+
+
+class ProfilerMiddleware:
+    def __init__(self, app, state: ProfilerState = profiler_state):
+        self.app = app
+        self.state = state
+
+    async def __call__(self, scope, receive, send):
+        state = self.state
+        if not state.enabled or scope["type"] != "http" or not state.wants(scope):
+            await self.app(scope, receive, send)
+            return
+        # одновременно профилируем один запрос: сэмплер видит все потоки процесса
+        if not state._busy.acquire(blocking=False):
+            state.skipped_busy += 1
+            await self.app(scope, receive, send)
+            return
+
+        sampler = StackSampler(state.interval)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            elapsed = time.perf_counter() - started
+            try:
+                # join потока и запись файла не должны блокировать event loop
+                await run_in_threadpool(self._finish, scope, sampler, elapsed)
+            finally:
+                state._busy.release()
+
+    def _finish(self, scope, sampler: StackSampler, elapsed: float) -> None:
+        sampler.stop()
+        state = self.state
+        state.output_dir.mkdir(parents=True, exist_ok=True)
+        path = state.output_dir / _profile_filename(scope, elapsed)
+        path.write_text(sampler.folded(), encoding="utf-8")
+        state.profiled += 1
+        state.recent = (state.recent + [path.name])[-20:]
+        self._prune()
+
+    def _prune(self) -> None:
+        # имена начинаются с метки времени, поэтому сортировка по имени — по возрасту
+        files = sorted(self.state.output_dir.glob("*.folded"))
+        for path in files[: max(len(files) - self.state.max_files, 0)]:
+            path.unlink(missing_ok=True)
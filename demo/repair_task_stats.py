@@ -0,0 +1,33 @@
+import time
+
+from sqlalchemy import delete, func, insert, select
+
+from database import engine, DATABASE_URL, Task, UserTaskStats
+
+
+def rebuild_task_stats(connection) -> int:
+    connection.execute(delete(UserTaskStats))
+    result = connection.execute(
+        insert(UserTaskStats).from_select(
+            ["user_id", "total", "done", "last_activity"],
+            select(
+                Task.owner_id,
+                func.count(),
+                func.sum(Task.is_done),
+                func.max(Task.updated_at),
+            ).group_by(Task.owner_id),
+        )
+    )
+    return result.rowcount
+
+
+def main() -> None:
+    print(f"Rebuilding user_task_stats at: {DATABASE_URL}")
+    started = time.perf_counter()
+    with engine.begin() as connection:
+        users = rebuild_task_stats(connection)
+    print(f"Done. {users} users in {time.perf_counter() - started:.2f}s.")
+
+
+if __name__ == "__main__":
+    main()
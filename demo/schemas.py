@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, ConfigDict
+from pydantic import BaseModel, EmailStr, ConfigDict, Field, field_validator
 from datetime import datetime
 from typing import Optional
 
@@ -23,6 +23,14 @@ class TaskUpdate(BaseModel):
     due_date: Optional[datetime] = None
     is_done: Optional[bool] = None
 
+    @field_validator("title", "is_done")
+    @classmethod
+    def not_null(cls, value):
+        # поле можно пропустить, но не обнулить: в таблице оно NOT NULL
+        if value is None:
+            raise ValueError("must not be null")
+        return value
+
 
 class TaskIn(BaseModel):
     title: str
@@ -40,3 +48,37 @@ class TaskOut(BaseModel):
     is_done: bool
     owner_id: int
     created_at: datetime
+
+
+class TaskBatchUpdate(TaskUpdate):
+    id: int
+
+
+class TaskBatchDelete(BaseModel):
+    ids: list[int]
+
+
+class TaskBatchResult(BaseModel):
+    id: int
+    status: str
+    task: Optional[TaskOut] = None
+
+
+class TaskSearchResult(TaskOut):
+    snippet: str
+    rank: float
+
+
+class TaskStats(BaseModel):
+    total: int
+    done: int
+    active: int
+    overdue: int
+    last_activity: Optional[datetime]
+
+
+class ProfilerConfig(BaseModel):
+    enabled: bool
+    sample_rate: float = Field(default=0.0, ge=0.0, le=1.0)
+    path_prefix: Optional[str] = None
+    interval_ms: float = Field(default=5.0, gt=0.0, le=1000.0)
@@ -0,0 +1,217 @@
+import argparse
+import hashlib
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import DDL, func, insert, select, text, update
+
+from database import (
+    Base,
+    engine,
+    DATABASE_URL,
+    TASKS_FTS_DDL,
+    TASKS_STATS_DDL,
+    TASKS_VERSION_DDL,
+    RefreshToken,
+    Task,
+    User,
+    hash_password,
+)
+from permissions import init_permissions_by_role
+from repair_task_stats import rebuild_task_stats
+
+PASSWORD = "password123"
+INSERT_TRIGGERS = ("tasks_fts_ai", "tasks_version_ai", "tasks_stats_ai")
+
+
+def user_email(index: int) -> str:
+    return f"user{index}@example.com"
+
+
+class Progress:
+    def __init__(self, label: str, total: int):
+        self.label = label
+        self.total = total
+        self.done = 0
+        self.started = time.perf_counter()
+
+    def advance(self, rows: int) -> None:
+        self.done += rows
+        elapsed = time.perf_counter() - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        sys.stdout.write(f"\r{self.label:<15} {self.done:>12,}/{self.total:,} rows  {rate:>12,.0f} rows/s")
+        sys.stdout.flush()
+
+    def finish(self) -> None:
+        sys.stdout.write("\n")
+
+
+def generate_users(first_index: int, count: int, password_hash: str):
+    permissions = init_permissions_by_role("user")
+    for index in range(first_index, first_index + count):
+        yield {"email": user_email(index), "password": password_hash, "permissions": permissions}
+
+
+def generate_tasks(rng: random.Random, owner_ids: range, count: int, now: datetime):
+    span = len(owner_ids)
+    for i in range(count):
+        # квадрат равномерной величины: у немногих пользователей много задач, у большинства — мало
+        owner_id = owner_ids[int(span * rng.random() ** 2)]
+        created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        due_date = None
+        if rng.random() < 0.6:
+            due_date = created_at + timedelta(days=rng.randint(-5, 60))
+        description = None
+        if rng.random() < 0.7:
+            description = "lorem " * min(int(rng.lognormvariate(3, 1)), 400)
+        yield {
+            "title": f"task {i}",
+            "description": description,
+            "is_done": rng.random() < 0.4,
+            "due_date": due_date,
+            "created_at": created_at,
+            "updated_at": created_at + timedelta(seconds=rng.randint(0, 7 * 24 * 3600)),
+            "owner_id": owner_id,
+        }
+
+
+def generate_refresh_tokens(rng: random.Random, owner_ids: range, per_user: int, seed: int, now: datetime):
+    for owner_id in owner_ids:
+        family_id = hashlib.sha256(f"family-{seed}-{owner_id}".encode()).hexdigest()
+        for k in range(per_user):
+            expires_at = now + timedelta(days=rng.uniform(-10, 7))
+            revoked = k < per_user - 1 or rng.random() < 0.2
+            yield {
+                "token_hash": hashlib.sha256(f"token-{seed}-{owner_id}-{k}".encode()).hexdigest(),
+                "user_id": owner_id,
+                "family_id": family_id,
+                "expires_at": expires_at,
+                "revoked_at": expires_at - timedelta(days=rng.uniform(1, 6)) if revoked else None,
+                "created_at": expires_at - timedelta(days=7),
+            }
+
+
+def insert_batches(target, table, rows, total: int, batch_size: int, commit_every: int, label: str) -> None:
+    progress = Progress(label, total)
+    batch = []
+    connection = target.connect()
+    transaction = connection.begin()
+    since_commit = 0
+    try:
+        for row in rows:
+            batch.append(row)
+            if len(batch) < batch_size:
+                continue
+            connection.execute(insert(table), batch)
+            progress.advance(len(batch))
+            since_commit += len(batch)
+            batch = []
+            if since_commit >= commit_every:
+                transaction.commit()
+                transaction = connection.begin()
+                since_commit = 0
+        if batch:
+            connection.execute(insert(table), batch)
+            progress.advance(len(batch))
+        transaction.commit()
+    finally:
+        connection.close()
+        progress.finish()
+
+
+def _trigger_ddl(name: str) -> str:
+    for statement in TASKS_FTS_DDL + TASKS_VERSION_DDL + TASKS_STATS_DDL:
+        if f"CREATE TRIGGER IF NOT EXISTS {name} " in statement:
+            return statement
+    raise LookupError(name)
+
+
+def drop_insert_triggers(connection) -> None:
+    for name in INSERT_TRIGGERS:
+        connection.execute(text(f"DROP TRIGGER IF EXISTS {name}"))
+
+
+def restore_insert_triggers(connection) -> None:
+    # сиды вставляются без триггеров — производные данные пересчитываем одним проходом
+    for name in INSERT_TRIGGERS:
+        connection.execute(DDL(_trigger_ddl(name)))
+    connection.execute(text("INSERT INTO tasks_fts(tasks_fts) VALUES ('rebuild')"))
+    rebuild_task_stats(connection)
+    connection.execute(
+        update(User).values(tasks_version=User.tasks_version + 1, tasks_changed_at=datetime.utcnow())
+    )
+
+
+def seed(
+    users: int,
+    tasks: int,
+    refresh_tokens_per_user: int = 2,
+    seed_value: int = 42,
+    anchor: Optional[datetime] = None,
+    batch_size: int = 10_000,
+    commit_every: int = 200_000,
+    target=engine,
+) -> range:
+    rng = random.Random(seed_value)
+    now = anchor or datetime.combine(date.today(), datetime.min.time())
+    Base.metadata.create_all(bind=target)
+    with target.connect() as connection:
+        first_id = (connection.execute(select(func.max(User.id))).scalar() or 0) + 1
+    owner_ids = range(first_id, first_id + users)
+
+    users_rows = generate_users(first_id - 1, users, hash_password(PASSWORD))
+    insert_batches(target, User, users_rows, users, batch_size, commit_every, "users")
+
+    sqlite = target.dialect.name == "sqlite"
+    if sqlite:
+        with target.begin() as connection:
+            drop_insert_triggers(connection)
+    try:
+        task_rows = generate_tasks(rng, owner_ids, tasks, now)
+        insert_batches(target, Task, task_rows, tasks, batch_size, commit_every, "tasks")
+    finally:
+        if sqlite:
+            with target.begin() as connection:
+                restore_insert_triggers(connection)
+
+    token_rows = generate_refresh_tokens(rng, owner_ids, refresh_tokens_per_user, seed_value, now)
+    total_tokens = users * refresh_tokens_per_user
+    insert_batches(target, RefreshToken, token_rows, total_tokens, batch_size, commit_every, "refresh_tokens")
+    return owner_ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk-seed users, tasks and refresh tokens")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--refresh-tokens-per-user", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--anchor",
+        type=datetime.fromisoformat,
+        default=None,
+        help="date the generated timestamps are relative to (default: today)",
+    )
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--commit-every", type=int, default=200_000)
+    args = parser.parse_args()
+
+    print(f"Seeding database at: {DATABASE_URL}")
+    started = time.perf_counter()
+    seed(
+        args.users,
+        args.tasks,
+        args.refresh_tokens_per_user,
+        args.seed,
+        args.anchor,
+        args.batch_size,
+        args.commit_every,
+    )
+    print(f"Done in {time.perf_counter() - started:.1f}s. Password for every user: {PASSWORD}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,31 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Iterable, Optional
+
+import orjson
+from fastapi import Response
+from sqlalchemy.engine import Row
+
+
+@dataclass(slots=True)
+class TaskRecord:
+    # поля и их порядок совпадают с TASK_COLUMNS и TaskOut
+    id: int
+    title: str
+    description: Optional[str]
+    due_date: Optional[datetime]
+    is_done: bool
+    owner_id: int
+    created_at: datetime
+
+
+def task_records(rows: Iterable[Row]) -> list[TaskRecord]:
+    return [TaskRecord(*row) for row in rows]
+
+
+def sparse_records(rows: Iterable[Row], fields: tuple[str, ...]) -> list[dict]:
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def json_response(content, headers: Optional[dict] = None) -> Response:
+    return Response(orjson.dumps(content), media_type="application/json", headers=headers)
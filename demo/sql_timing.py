@@ -0,0 +1,106 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from config import SQL_N_PLUS_ONE_THRESHOLD, SQL_SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger("sql.slow")
+
+
+class QueryStats:
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes: dict[str, int] = {}
+
+    def record(self, statement: str, elapsed: float, executemany: bool = False) -> None:
+        self.count += 1
+        self.seconds += elapsed
+        # пачки executemany (импорт, сиды) повторяют одну форму намеренно — это не N+1
+        if not executemany:
+            self.shapes[statement] = self.shapes.get(statement, 0) + 1
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        return [(statement, count) for statement, count in self.shapes.items() if count >= threshold]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.2f};desc="{self.count} queries"'
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+def current_query_stats() -> Optional[QueryStats]:
+    return _current_stats.get()
+
+
+def explain_query_plan(connection, statement: str, parameters) -> Optional[list[str]]:
+    if connection.dialect.name != "sqlite" or not statement.lstrip().upper().startswith("SELECT"):
+        return None
+    # сырой DBAPI-курсор: не трогает курсор исходного запроса и не проходит через эти же хуки
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_started")
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, elapsed, executemany)
+    if 0 <= SQL_SLOW_QUERY_MS <= elapsed * 1000:
+        try:
+            plan = explain_query_plan(conn, statement, parameters)
+        except Exception:
+            plan = None
+        slow_query_logger.warning(
+            "slow query %.1fms: %s params=%r plan=%s", elapsed * 1000, statement, parameters, plan
+        )
+
+
+class QueryStatsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = _current_stats.set(stats)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = [
+                    *message.get("headers", ()),
+                    (b"server-timing", stats.server_timing().encode("latin-1")),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            for statement, count in stats.repeated(SQL_N_PLUS_ONE_THRESHOLD):
+                logger.warning(
+                    "possible N+1: %s %s ran the same statement %s times: %s",
+                    scope["method"],
+                    scope["path"],
+                    count,
+                    statement,
+                )
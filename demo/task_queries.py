@@ -0,0 +1,139 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import column, func, literal_column, select, table, tuple_
+from sqlalchemy.sql import Select
+
+from database import Task, User, UserTaskStats
+from pagination import decode_cursor
+
+
+tasks_fts = table("tasks_fts", column("rowid"), column("title"), column("description"))
+
+TASK_COLUMNS = (
+    Task.id,
+    Task.title,
+    Task.description,
+    Task.due_date,
+    Task.is_done,
+    Task.owner_id,
+    Task.created_at,
+)
+TASK_FIELDS = {column.key: column for column in TASK_COLUMNS}
+
+
+def parse_fields(fields: Optional[str]) -> Optional[tuple[str, ...]]:
+    if fields is None:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    if not requested:
+        raise HTTPException(status_code=400, detail="fields must not be empty")
+    unknown = requested - TASK_FIELDS.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in TASK_FIELDS if name in requested)
+
+
+def project_columns(fields: tuple[str, ...], *required) -> tuple:
+    # запрошенные колонки идут первыми: служебные хвосты отрезает zip в sparse_records
+    columns = [TASK_FIELDS[name] for name in fields]
+    columns += [column for column in required if column.key not in fields]
+    return tuple(columns)
+
+
+def filter_tasks(
+    statement: Select,
+    owner_id: int,
+    is_done: Optional[bool] = None,
+    due_before: Optional[datetime] = None,
+) -> Select:
+    statement = statement.where(Task.owner_id == owner_id)
+    if is_done is not None:
+        statement = statement.where(Task.is_done == is_done)
+    if due_before is not None:
+        statement = statement.where(Task.due_date <= due_before)
+    return statement
+
+
+def tasks_version_statement(owner_id: int) -> Select:
+    return select(User.tasks_version, User.tasks_changed_at).where(User.id == owner_id)
+
+
+def task_version_statement(task_id: int, fields: tuple[str, ...] = ()) -> Select:
+    return select(*project_columns(fields, Task.owner_id, Task.updated_at)).where(Task.id == task_id)
+
+
+def task_list_statement(
+    owner_id: int,
+    is_done: Optional[bool] = None,
+    due_before: Optional[datetime] = None,
+    limit: int = 10,
+    offset: int = 0,
+    cursor: Optional[str] = None,
+    fields: Optional[tuple[str, ...]] = None,
+) -> Select:
+    columns = TASK_COLUMNS if fields is None else project_columns(fields, Task.created_at, Task.id)
+    statement = filter_tasks(select(*columns), owner_id, is_done, due_before)
+    statement = statement.order_by(Task.created_at.desc(), Task.id.desc())
+    if cursor:
+        if offset:
+            raise HTTPException(status_code=400, detail="Use either cursor or offset")
+        statement = statement.where(tuple_(Task.created_at, Task.id) < decode_cursor(cursor))
+    else:
+        statement = statement.offset(offset)
+
+    return statement.limit(limit)
+
+
+def task_export_statement(
+    owner_id: int,
+    is_done: Optional[bool] = None,
+    due_before: Optional[datetime] = None,
+    batch_size: int = 1000,
+) -> Select:
+    statement = filter_tasks(select(*TASK_COLUMNS), owner_id, is_done, due_before)
+    return (
+        statement.order_by(Task.created_at.desc(), Task.id.desc())
+        .execution_options(yield_per=batch_size)
+    )
+
+
+def fts_match_query(query: str) -> str:
+    tokens = query.split()
+    if not tokens:
+        raise HTTPException(status_code=400, detail="Search query is empty")
+    return " ".join('"' + token.replace('"', '""') + '"*' for token in tokens)
+
+
+def task_search_statement(owner_id: int, query: str, limit: int = 10, offset: int = 0) -> Select:
+    fts = literal_column("tasks_fts")
+    rank = func.bm25(fts).label("rank")
+    return (
+        select(
+            *TASK_COLUMNS,
+            func.snippet(fts, -1, "[", "]", "…", 12).label("snippet"),
+            rank,
+        )
+        .select_from(tasks_fts)
+        .join(Task, Task.id == tasks_fts.c.rowid)
+        .where(fts.op("MATCH")(fts_match_query(query)))
+        .where(Task.owner_id == owner_id)
+        .order_by(rank, Task.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+
+
+def task_stats_statement(owner_id: int) -> Select:
+    return select(UserTaskStats.total, UserTaskStats.done, UserTaskStats.last_activity).where(
+        UserTaskStats.user_id == owner_id
+    )
+
+
+def overdue_count_statement(owner_id: int, now: datetime) -> Select:
+    return select(func.count()).where(
+        Task.owner_id == owner_id,
+        Task.is_done.is_(False),
+        Task.due_date < now,
+    )
@@ -1,28 +1,37 @@
+import os
 import sys
 from pathlib import Path
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
 
 from database import Base
 from dependencies import get_db
+from jwt_manager import access_denylist, principal_cache, verified_token_cache
 from main import app
 
 
 @pytest.fixture()
-def client():
+def engine():
     engine = create_engine(
         "sqlite://",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
-    testing_session_local = sessionmaker(bind=engine, autoflush=False, autocommit=False)
     Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture()
+def client(engine):
+    testing_session_local = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
     def override_get_db():
         db = testing_session_local()
@@ -32,6 +41,52 @@ def client():
             db.close()
 
     app.dependency_overrides[get_db] = override_get_db
+    principal_cache.clear()
+    access_denylist.clear()
+    verified_token_cache.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
+    principal_cache.clear()
+    access_denylist.clear()
+    verified_token_cache.clear()
+
+
+@pytest.fixture()
+def auth_headers(client):
+    client.post(
+        "/registration",
+        json={"email": "owner@example.com", "password": "password123"}
+    )
+    login = client.post(
+        "/login",
+        json={"email": "owner@example.com", "password": "password123"}
+    )
+    return {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+
+@pytest.fixture()
+def captured_selects(engine):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def assert_no_table_scans(engine, statements):
+    assert statements
+    for statement, parameters in statements:
+        plan = explain(engine, statement, parameters)
+        scans = [step for step in plan if step.startswith("SCAN")]
+        assert not scans, f"{statement!r} falls back to a scan: {plan}"
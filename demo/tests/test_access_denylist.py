@@ -0,0 +1,49 @@
+import time
+
+from sqlalchemy.orm import Session
+
+from database import RevokedAccessToken
+from denylist import AccessTokenDenylist
+from jwt_manager import access_denylist
+
+
+def test_logout_revokes_access_token(client, auth_headers):
+    assert client.get("/me", headers=auth_headers).status_code == 200
+
+    logout = client.post("/logout", headers=auth_headers)
+    assert logout.status_code == 200
+
+    me = client.get("/me", headers=auth_headers)
+    assert me.status_code == 401
+    assert me.json()["detail"] == "Token revoked"
+
+
+def test_denylist_survives_restart(client, engine, auth_headers):
+    client.post("/logout", headers=auth_headers)
+    with Session(engine) as db:
+        assert db.query(RevokedAccessToken).count() == 1
+
+    access_denylist.clear()
+    assert client.get("/me", headers=auth_headers).status_code == 401
+    assert access_denylist.loaded
+
+
+def test_other_sessions_stay_valid(client, auth_headers):
+    login = client.post("/login", json={"email": "owner@example.com", "password": "password123"})
+    other_headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+
+    client.post("/logout", headers=auth_headers)
+
+    assert client.get("/me", headers=other_headers).status_code == 200
+
+
+def test_denylist_evicts_expired_entries():
+    denylist = AccessTokenDenylist(bloom_bits=1024, bloom_hashes=3)
+    denylist.add("expired", time.time() - 1)
+    denylist.add("live", time.time() + 60)
+
+    assert denylist.is_revoked("live")
+    assert not denylist.is_revoked("expired")
+    assert not denylist.is_revoked("never-revoked")
+    assert denylist.stats()["size"] == 1
+    assert denylist.stats()["evictions"] == 1
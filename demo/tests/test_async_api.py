@@ -0,0 +1,85 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+from async_api import router
+from database import Base
+from dependencies import get_async_db
+from jwt_manager import access_denylist, principal_cache, verified_token_cache
+
+
+@pytest.fixture()
+def async_client(tmp_path):
+    db_path = tmp_path / "async.db"
+    sync_engine = create_engine(f"sqlite:///{db_path}")
+    Base.metadata.create_all(bind=sync_engine)
+    sync_engine.dispose()
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+    session_local = async_sessionmaker(bind=async_engine, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with session_local() as db:
+            yield db
+
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    principal_cache.clear()
+    access_denylist.clear()
+    verified_token_cache.clear()
+    with TestClient(app) as test_client:
+        yield test_client
+    principal_cache.clear()
+    access_denylist.clear()
+    verified_token_cache.clear()
+
+
+def test_async_auth_and_task_flow(async_client):
+    registration = async_client.post(
+        "/registration",
+        json={"email": "user@example.com", "password": "password123"}
+    )
+    assert registration.status_code == 200
+
+    login = async_client.post(
+        "/login",
+        json={"email": "user@example.com", "password": "password123"}
+    )
+    tokens = login.json()
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+
+    assert async_client.get("/me", headers=headers).json()["email"] == "user@example.com"
+
+    created = async_client.post("/tasks", json={"title": "async task"}, headers=headers)
+    assert created.status_code == 200
+    task_id = created.json()["id"]
+
+    etag = async_client.get(f"/tasks/{task_id}", headers=headers).headers["ETag"]
+    updated = async_client.patch(
+        f"/tasks/{task_id}", json={"is_done": True}, headers={**headers, "If-Match": etag}
+    )
+    assert updated.json()["is_done"] is True
+    assert updated.headers["ETag"] != etag
+
+    listed = async_client.get("/tasks", headers=headers)
+    assert [task["id"] for task in listed.json()] == [task_id]
+    cached = async_client.get("/tasks", headers={**headers, "If-None-Match": listed.headers["ETag"]})
+    assert cached.status_code == 304
+
+    assert async_client.delete(f"/tasks/{task_id}", headers=headers).status_code == 200
+    assert async_client.get(f"/tasks/{task_id}", headers=headers).status_code == 404
+
+    refresh = async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert refresh.status_code == 200
+    replay = async_client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+
+    logout = async_client.post(
+        "/logout", json={"refresh_token": refresh.json()["refresh_token"]}, headers=headers
+    )
+    assert logout.status_code == 200
+    assert async_client.get("/me", headers=headers).status_code == 401
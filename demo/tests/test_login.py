@@ -0,0 +1,98 @@
+import asyncio
+import threading
+
+from passlib.hash import bcrypt
+from sqlalchemy.orm import Session
+
+import database
+import main
+from database import User
+
+
+def register(client, email="user@example.com", password="password123"):
+    return client.post("/registration", json={"email": email, "password": password})
+
+
+def test_login_rehashes_outdated_password(client, engine, monkeypatch):
+    register(client)
+    with Session(engine) as db:
+        user = db.query(User).filter(User.email == "user@example.com").first()
+        user.password = bcrypt.using(rounds=4).hash("password123")
+        db.commit()
+    monkeypatch.setattr(
+        database,
+        "pwd_context",
+        database.pwd_context.copy(bcrypt__default_rounds=5, bcrypt__min_rounds=5),
+    )
+
+    login = client.post("/login", json={"email": "user@example.com", "password": "password123"})
+    assert login.status_code == 200
+
+    with Session(engine) as db:
+        stored = db.query(User).filter(User.email == "user@example.com").first().password
+    assert bcrypt.from_string(stored).rounds == 5
+
+
+def test_login_returns_503_when_hash_pool_is_full(client, monkeypatch):
+    register(client)
+    monkeypatch.setattr(database, "_password_slots", threading.BoundedSemaphore(1))
+    database._password_slots.acquire()
+
+    login = client.post("/login", json={"email": "user@example.com", "password": "password123"})
+    assert login.status_code == 503
+    assert login.headers["Retry-After"] == "1"
+
+
+def test_registration_uses_bounded_hash_pool(client, monkeypatch):
+    monkeypatch.setattr(database, "_password_slots", threading.BoundedSemaphore(1))
+    database._password_slots.acquire()
+
+    response = register(client)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+
+def test_registration_keeps_db_work_off_the_event_loop(client, monkeypatch):
+    loops = []
+
+    def running_loop():
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    def spy(function):
+        def wrapper(*args):
+            loops.append(running_loop())
+            return function(*args)
+        return wrapper
+
+    monkeypatch.setattr(main, "get_user_by_email", spy(main.get_user_by_email))
+    monkeypatch.setattr(main, "create_user", spy(main.create_user))
+
+    assert register(client).status_code == 200
+    assert loops == [None, None]
+
+def test_refresh_token_reuse_revokes_family(client):
+    register(client)
+    tokens = client.post("/login", json={"email": "user@example.com", "password": "password123"}).json()
+    rotated = client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert rotated.status_code == 200
+
+    replay = client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+
+    descendant = client.post("/token/refresh", json={"refresh_token": rotated.json()["refresh_token"]})
+    assert descendant.status_code == 401
+
+
+def test_refresh_token_families_are_independent(client):
+    register(client)
+    credentials = {"email": "user@example.com", "password": "password123"}
+    first = client.post("/login", json=credentials).json()
+    second = client.post("/login", json=credentials).json()
+
+    client.post("/token/refresh", json={"refresh_token": first["refresh_token"]})
+    client.post("/token/refresh", json={"refresh_token": first["refresh_token"]})
+
+    refresh = client.post("/token/refresh", json={"refresh_token": second["refresh_token"]})
+    assert refresh.status_code == 200
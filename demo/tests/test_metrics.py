@@ -0,0 +1,85 @@
+import gc
+import threading
+
+from metrics import Counter, Histogram
+
+
+def sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_metrics_exposes_route_counters_and_latency(client, auth_headers):
+    before = sample(client.get("/metrics").text, 'http_requests_total{route="/me",method="GET",status="200"}')
+    client.get("/me", headers=auth_headers)
+    client.get("/me", headers=auth_headers)
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert sample(text, 'http_requests_total{route="/me",method="GET",status="200"}') == before + 2
+    assert 'http_request_duration_seconds_bucket{route="/me",method="GET",le="+Inf"}' in text
+    assert "# TYPE http_requests_in_flight gauge" in text
+    assert sample(text, 'login_duration_seconds_count{outcome="success"}') >= 1
+    assert sample(text, 'password_hash_duration_seconds_count{operation="hash"}') >= 1
+
+
+def test_metrics_count_refresh_rotations(client):
+    credentials = {"email": "user@example.com", "password": "password123"}
+    client.post("/registration", json=credentials)
+    tokens = client.post("/login", json=credentials).json()
+    rotated = 'refresh_token_rotations_total{outcome="rotated"}'
+    reused = 'refresh_token_rotations_total{outcome="reuse_detected"}'
+    text = client.get("/metrics").text
+    rotated_before, reused_before = sample(text, rotated), sample(text, reused)
+
+    client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+    text = client.get("/metrics").text
+    assert sample(text, rotated) == rotated_before + 1
+    assert sample(text, reused) == reused_before + 1
+
+
+def test_counter_sums_thread_shards():
+    counter = Counter("test_total", "Test counter.")
+
+    def work():
+        for _ in range(1000):
+            counter.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert "test_total 8000.0" in counter.render()
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_seconds", "Test histogram.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+
+    lines = histogram.render().splitlines()
+    assert 'test_seconds_bucket{le="0.1"} 1.0' in lines
+    assert 'test_seconds_bucket{le="1.0"} 2.0' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3.0' in lines
+    assert "test_seconds_count 3.0" in lines
+
+
+def test_retired_thread_shards_are_folded():
+    counter = Counter("retired_total", "Retired thread increments.")
+
+    for _ in range(20):
+        thread = threading.Thread(target=counter.inc, args=(2,))
+        thread.start()
+        thread.join()
+    gc.collect()
+
+    assert counter._default._shards._shards == []
+    assert counter._default.value() == 40
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from jwt_manager import Principal
+from permissions import (
+    check_permission,
+    check_permission_async,
+    compile_permissions,
+    require_all,
+    require_all_async,
+    require_any,
+    require_any_async,
+)
+
+
+def make_user(permissions: str) -> Principal:
+    return Principal(id=1, email="user@example.com", permissions=permissions)
+
+
+def test_compiled_permissions_are_cached():
+    assert compile_permissions("task.read,task.create") is compile_permissions("task.read,task.create")
+    assert check_permission("task.read") is check_permission("task.read")
+
+
+def test_require_all_and_any():
+    user = make_user("task.read,task.create")
+
+    assert require_all("task.read", "task.create")(current_user=user) is user
+    assert require_any("task.delete", "task.read")(current_user=user) is user
+    with pytest.raises(HTTPException):
+        require_all("task.read", "task.delete")(current_user=user)
+    with pytest.raises(HTTPException):
+        require_any("task.delete", "comment.delete")(current_user=user)
+
+
+def test_async_require_all_and_any():
+    user = make_user("task.read,task.create")
+
+    assert asyncio.run(require_all_async("task.read", "task.create")(current_user=user)) is user
+    assert asyncio.run(require_any_async("task.delete", "task.read")(current_user=user)) is user
+    with pytest.raises(HTTPException):
+        asyncio.run(require_all_async("task.read", "task.delete")(current_user=user))
+    with pytest.raises(HTTPException):
+        asyncio.run(require_any_async("task.delete", "comment.delete")(current_user=user))
+    assert check_permission_async("task.read") is require_all_async("task.read")
+
+
+def test_wildcard_grants_everything():
+    admin = make_user("*")
+    assert require_all("admin.panel", "task.delete")(current_user=admin) is admin
@@ -0,0 +1,48 @@
+from sqlalchemy.orm import Session
+
+import jwt_manager
+from database import User
+from jwt_manager import create_access_token, principal_cache, verified_token_cache
+
+
+def test_me_served_from_principal_cache(client, auth_headers):
+    first = client.get("/me", headers=auth_headers)
+    misses = principal_cache.misses
+    second = client.get("/me", headers=auth_headers)
+
+    assert first.json() == second.json()
+    assert principal_cache.misses == misses
+    assert principal_cache.hits >= 1
+
+
+def test_principal_invalidated_on_user_update(client, engine, auth_headers):
+    client.get("/me", headers=auth_headers)
+
+    with Session(engine) as db:
+        user = db.query(User).filter(User.email == "owner@example.com").first()
+        user.permissions = "task.read"
+        db.commit()
+
+    response = client.get("/me", headers=auth_headers)
+    assert response.json()["permissions"] == "task.read"
+
+
+def test_verified_token_cache_skips_repeated_decode(client, auth_headers, monkeypatch):
+    client.get("/me", headers=auth_headers)
+    calls = []
+    monkeypatch.setattr(jwt_manager.jwt, "decode", lambda *args, **kwargs: calls.append(args))
+
+    assert client.get("/me", headers=auth_headers).status_code == 200
+    assert calls == []
+    assert verified_token_cache.hits >= 1
+
+
+def test_verified_token_cache_bounded_by_token_expiry(client, auth_headers):
+    client.get("/me", headers=auth_headers)
+    expired = create_access_token({"id": 1}, expires_minutes=-1)
+    size = verified_token_cache.stats()["size"]
+
+    response = client.get("/me", headers={"Authorization": f"Bearer {expired}"})
+
+    assert response.status_code == 401
+    assert verified_token_cache.stats()["size"] == size
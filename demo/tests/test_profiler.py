@@ -0,0 +1,116 @@
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import Session
+
+from database import User
+from profiler import ProfilerMiddleware, ProfilerState, profiler_state
+
+
+@pytest.fixture()
+def admin_headers(client, engine, auth_headers):
+    with Session(engine) as db:
+        db.query(User).filter(User.email == "owner@example.com").update({"permissions": "*"})
+        db.commit()
+    return auth_headers
+
+
+@pytest.fixture()
+def profiles_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler_state, "output_dir", tmp_path)
+    yield tmp_path
+    profiler_state.configure(False, 0.0, None, 5.0)
+
+
+def test_profiler_toggle_requires_admin(client, auth_headers, profiles_dir):
+    response = client.post("/admin/profiler", json={"enabled": True}, headers=auth_headers)
+    assert response.status_code == 403
+    assert profiler_state.enabled is False
+
+
+def test_profiler_writes_folded_stacks_for_matching_path(client, admin_headers, profiles_dir):
+    response = client.post(
+        "/admin/profiler",
+        json={"enabled": True, "path_prefix": "/tasks", "interval_ms": 1},
+        headers=admin_headers,
+    )
+    assert response.json()["enabled"] is True
+
+    client.get("/me", headers=admin_headers)
+    client.get("/tasks", headers=admin_headers)
+
+    files = list(profiles_dir.iterdir())
+    assert len(files) == 1
+    assert "-GET-tasks-" in files[0].name
+    assert client.get("/admin/profiler", headers=admin_headers).json()["recent"] == [files[0].name]
+
+
+def test_sampler_output_is_folded_format(tmp_path):
+    state = ProfilerState(tmp_path)
+    state.configure(True, 1.0, None, 1.0)
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware, state=state)
+
+    @app.get("/busy")
+    def busy():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        return {}
+
+    TestClient(app).get("/busy")
+
+    lines = next(tmp_path.iterdir()).read_text().splitlines()
+    assert lines
+    assert all(int(line.rsplit(" ", 1)[1]) > 0 for line in lines)
+    assert any("test_profiler:busy" in line for line in lines)
+
+
+def test_disabled_profiler_passes_through(tmp_path):
+    state = ProfilerState(tmp_path)
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware, state=state)
+    app.get("/ping")(lambda: {})
+
+    TestClient(app).get("/ping", headers={"X-Profile": "1"})
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def ping_app(state: ProfilerState) -> TestClient:
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware, state=state)
+    app.get("/ping")(lambda: {})
+    return TestClient(app)
+
+
+def test_profile_header_requires_secret(tmp_path):
+    state = ProfilerState(tmp_path, header_secret="s3cret")
+    state.configure(True, 0.0, None, 1.0)
+    client = ping_app(state)
+
+    client.get("/ping", headers={"X-Profile": "guess"})
+    assert list(tmp_path.iterdir()) == []
+
+    client.get("/ping", headers={"X-Profile": "s3cret"})
+    assert len(list(tmp_path.iterdir())) == 1
+
+    unset = ProfilerState(tmp_path / "unset")
+    unset.configure(True, 0.0, None, 1.0)
+    ping_app(unset).get("/ping", headers={"X-Profile": ""})
+    assert not (tmp_path / "unset").exists()
+
+
+def test_profile_files_are_capped(tmp_path):
+    state = ProfilerState(tmp_path, max_files=3)
+    state.configure(True, 1.0, None, 1.0)
+    client = ping_app(state)
+
+    for _ in range(5):
+        client.get("/ping")
+
+    files = sorted(path.name for path in tmp_path.iterdir())
+    assert len(files) == 3
+    assert files == state.recent[-3:]
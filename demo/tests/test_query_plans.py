@@ -0,0 +1,55 @@
+import pytest
+
+from conftest import assert_no_table_scans
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {},
+        {"limit": 5, "offset": 5},
+        {"is_done": "false"},
+        {"is_done": "true", "due_before": "2030-01-01T00:00:00"},
+        {"due_before": "2030-01-01T00:00:00"},
+    ],
+)
+def test_task_list_queries_use_indexes(client, engine, auth_headers, captured_selects, params):
+    for i in range(3):
+        client.post(
+            "/tasks",
+            json={"title": f"task {i}", "due_date": "2029-01-01T00:00:00"},
+            headers=auth_headers,
+        )
+    captured_selects.clear()
+
+    response = client.get("/tasks", params=params, headers=auth_headers)
+    assert response.status_code == 200
+
+    assert_no_table_scans(engine, captured_selects)
+
+
+def test_path_task_queries_use_indexes(client, engine, auth_headers, captured_selects):
+    client.post("/tasks", json={"title": "task"}, headers=auth_headers)
+    client.cookies.set("access_token", auth_headers["Authorization"].split()[1])
+    captured_selects.clear()
+
+    response = client.get("/path_task")
+    assert response.status_code == 200
+
+    assert_no_table_scans(engine, captured_selects)
+
+
+def test_cursor_page_query_uses_index(client, engine, auth_headers, captured_selects):
+    for i in range(3):
+        client.post("/tasks", json={"title": f"task {i}"}, headers=auth_headers)
+    first_page = client.get("/tasks", params={"limit": 2}, headers=auth_headers)
+    captured_selects.clear()
+
+    response = client.get(
+        "/tasks",
+        params={"limit": 2, "cursor": first_page.headers["X-Next-Cursor"]},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+
+    assert_no_table_scans(engine, captured_selects)
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from sqlalchemy import func, insert, select, text
+
+from database import Base, RefreshToken, Task, User, UserTaskStats
+from seed_db import seed
+
+ANCHOR = datetime(2026, 1, 1)
+
+
+def test_seed_fills_tables_and_derived_data(engine):
+    seed(20, 500, refresh_tokens_per_user=2, anchor=ANCHOR, batch_size=64, commit_every=128, target=engine)
+
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count()).select_from(User)).scalar_one() == 20
+        assert connection.execute(select(func.count()).select_from(Task)).scalar_one() == 500
+        assert connection.execute(select(func.count()).select_from(RefreshToken)).scalar_one() == 40
+        assert connection.execute(select(func.sum(UserTaskStats.total))).scalar_one() == 500
+        matches = connection.execute(text("SELECT count(*) FROM tasks_fts WHERE tasks_fts MATCH 'task'"))
+        assert matches.scalar_one() == 500
+
+    with engine.begin() as connection:
+        connection.execute(insert(Task).values(title="after seeding", owner_id=1))
+    with engine.connect() as connection:
+        assert connection.execute(select(func.sum(UserTaskStats.total))).scalar_one() == 501
+
+
+def test_seed_is_deterministic(engine):
+    snapshots = []
+    for _ in range(2):
+        Base.metadata.drop_all(bind=engine)
+        seed(5, 200, anchor=ANCHOR, target=engine)
+        with engine.connect() as connection:
+            snapshots.append(
+                connection.execute(
+                    select(Task.owner_id, Task.is_done, Task.due_date, Task.description).order_by(Task.id)
+                ).all()
+            )
+
+    assert snapshots[0] == snapshots[1]
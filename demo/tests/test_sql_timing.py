@@ -0,0 +1,68 @@
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+import sql_timing
+from database import Task, User
+
+
+def test_server_timing_reports_db_time(client, auth_headers):
+    response = client.get("/tasks", headers=auth_headers)
+
+    timing = response.headers["Server-Timing"]
+    assert timing.startswith("db;dur=")
+    assert 'queries"' in timing
+
+
+def test_repeated_statement_logged_as_n_plus_one(engine, caplog, monkeypatch):
+    monkeypatch.setattr(sql_timing, "SQL_N_PLUS_ONE_THRESHOLD", 3)
+    app = FastAPI()
+    app.add_middleware(sql_timing.QueryStatsMiddleware)
+
+    @app.get("/fan-out")
+    def fan_out():
+        with engine.connect() as connection:
+            for user_id in range(3):
+                connection.execute(select(User.email).where(User.id == user_id)).all()
+        return {}
+
+    with caplog.at_level(logging.WARNING, logger="sql_timing"):
+        response = TestClient(app).get("/fan-out")
+
+    assert '"3 queries"' in response.headers["Server-Timing"]
+    messages = [record.getMessage() for record in caplog.records if record.name == "sql_timing"]
+    assert len(messages) == 1
+    assert "GET /fan-out ran the same statement 3 times" in messages[0]
+
+
+def test_executemany_batches_are_not_n_plus_one(engine, caplog, monkeypatch):
+    monkeypatch.setattr(sql_timing, "SQL_N_PLUS_ONE_THRESHOLD", 2)
+    app = FastAPI()
+    app.add_middleware(sql_timing.QueryStatsMiddleware)
+
+    @app.post("/bulk")
+    def bulk():
+        with engine.begin() as connection:
+            user_id = connection.execute(
+                insert(User).values(email="bulk@example.com", password="x", permissions="user")
+            ).inserted_primary_key[0]
+            for _ in range(3):
+                connection.execute(insert(Task), [{"title": "t", "owner_id": user_id}] * 10)
+        return {}
+
+    with caplog.at_level(logging.WARNING, logger="sql_timing"):
+        TestClient(app).post("/bulk")
+
+    assert not [record for record in caplog.records if record.name == "sql_timing"]
+
+
+def test_slow_query_log_includes_plan(client, auth_headers, caplog, monkeypatch):
+    monkeypatch.setattr(sql_timing, "SQL_SLOW_QUERY_MS", 0)
+
+    with caplog.at_level(logging.WARNING, logger="sql.slow"):
+        client.get("/tasks", headers=auth_headers)
+
+    plans = [record.getMessage() for record in caplog.records if record.name == "sql.slow"]
+    assert any("FROM tasks" in message and "ix_tasks_owner_id_created_at" in message for message in plans)
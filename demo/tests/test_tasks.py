@@ -0,0 +1,415 @@
+import base64
+import csv
+import io
+import json
+
+from sqlalchemy.orm import Session
+
+import main
+from database import Task
+from repair_task_stats import rebuild_task_stats
+from schemas import TaskOut
+from task_queries import parse_fields, task_list_statement
+
+
+def create_tasks(client, headers, count):
+    for i in range(count):
+        response = client.post("/tasks", json={"title": f"task {i}"}, headers=headers)
+        assert response.status_code == 200
+
+
+def test_cursor_pagination_walks_all_tasks(client, auth_headers):
+    create_tasks(client, auth_headers, 7)
+
+    seen = []
+    params = {"limit": 3}
+    while True:
+        response = client.get("/tasks", params=params, headers=auth_headers)
+        assert response.status_code == 200
+        seen.extend(task["id"] for task in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params = {"limit": 3, "cursor": cursor}
+
+    assert sorted(seen, reverse=True) == seen
+    assert len(set(seen)) == 7
+
+
+def test_cursor_is_stable_under_inserts(client, auth_headers):
+    create_tasks(client, auth_headers, 4)
+    first_page = client.get("/tasks", params={"limit": 2}, headers=auth_headers)
+    create_tasks(client, auth_headers, 2)
+
+    second_page = client.get(
+        "/tasks",
+        params={"limit": 2, "cursor": first_page.headers["X-Next-Cursor"]},
+        headers=auth_headers,
+    )
+    first_ids = {task["id"] for task in first_page.json()}
+    second_ids = {task["id"] for task in second_page.json()}
+    assert first_ids.isdisjoint(second_ids)
+    assert max(second_ids) < min(first_ids)
+
+
+def test_offset_pagination_still_supported(client, auth_headers):
+    create_tasks(client, auth_headers, 5)
+
+    response = client.get("/tasks", params={"limit": 2, "offset": 4}, headers=auth_headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_invalid_cursor_rejected(client, auth_headers):
+    response = client.get("/tasks", params={"cursor": "not-a-cursor"}, headers=auth_headers)
+    assert response.status_code == 400
+
+    for payload in ('["2020-01-01", 1e400]', '["2020-01-01", "1"]', '[1, 1]'):
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+        response = client.get("/tasks", params={"cursor": cursor}, headers=auth_headers)
+        assert response.status_code == 400
+
+
+def test_full_last_page_has_no_next_cursor(client, auth_headers):
+    create_tasks(client, auth_headers, 3)
+
+    response = client.get("/tasks", params={"limit": 3}, headers=auth_headers)
+    assert len(response.json()) == 3
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_path_task_counts_and_paginates(client, auth_headers, monkeypatch, captured_selects):
+    monkeypatch.setattr(main, "PATH_TASK_PAGE_SIZE", 2)
+    create_tasks(client, auth_headers, 3)
+    task_id = client.get("/tasks", headers=auth_headers).json()[0]["id"]
+    client.patch(f"/tasks/{task_id}", json={"is_done": True}, headers=auth_headers)
+    client.cookies.set("access_token", auth_headers["Authorization"].split()[1])
+    captured_selects.clear()
+
+    first = client.get("/path_task")
+    assert not [statement for statement, _ in captured_selects if "count(*)" in statement]
+    assert first.status_code == 200
+    assert first.text.count('class="task-item"') == 2
+    assert '<div class="stat-value">3</div>' in first.text
+    assert '<div class="stat-value">1</div>' in first.text
+    assert "/path_task?cursor=" in first.text
+
+    cursor = first.text.split("/path_task?cursor=")[1].split('"')[0]
+    second = client.get("/path_task", params={"cursor": cursor})
+    assert second.text.count('class="task-item"') == 1
+    assert "/path_task?cursor=" not in second.text
+
+
+def test_export_streams_ndjson_and_csv(client, auth_headers):
+    create_tasks(client, auth_headers, 3)
+    task_id = client.get("/tasks", headers=auth_headers).json()[0]["id"]
+    client.patch(f"/tasks/{task_id}", json={"is_done": True}, headers=auth_headers)
+
+    ndjson = client.get("/tasks/export", headers=auth_headers)
+    assert ndjson.status_code == 200
+    assert ndjson.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert len(rows) == 3
+    assert rows[0]["id"] == task_id
+
+    done_csv = client.get("/tasks/export", params={"format": "csv", "is_done": "true"}, headers=auth_headers)
+    records = list(csv.DictReader(io.StringIO(done_csv.text)))
+    assert [int(record["id"]) for record in records] == [task_id]
+
+
+def test_batch_create_update_delete(client, auth_headers):
+    created = client.post(
+        "/tasks/batch",
+        json=[{"title": "first"}, {"title": "second"}, {"title": "third"}],
+        headers=auth_headers,
+    )
+    assert created.status_code == 200
+    ids = [item["id"] for item in created.json()]
+    assert [item["task"]["title"] for item in created.json()] == ["first", "second", "third"]
+
+    updated = client.patch(
+        "/tasks/batch",
+        json=[{"id": ids[0], "is_done": True}, {"id": ids[1], "title": "renamed"}, {"id": 999, "is_done": True}],
+        headers=auth_headers,
+    )
+    results = updated.json()
+    assert [item["status"] for item in results] == ["updated", "updated", "not_found"]
+    assert results[0]["task"]["is_done"] is True
+    assert results[1]["task"]["title"] == "renamed"
+
+    deleted = client.request(
+        "DELETE", "/tasks/batch", json={"ids": [ids[0], ids[2], 999]}, headers=auth_headers
+    )
+    assert [item["status"] for item in deleted.json()] == ["deleted", "deleted", "not_found"]
+    assert [task["id"] for task in client.get("/tasks", headers=auth_headers).json()] == [ids[1]]
+
+
+def test_batch_create_runs_constant_queries(client, auth_headers):
+    created = client.post("/tasks/batch", json=[{"title": f"t{i}"} for i in range(100)], headers=auth_headers)
+
+    assert [item["task"]["title"] for item in created.json()] == [f"t{i}" for i in range(100)]
+    queries = int(created.headers["Server-Timing"].split('desc="')[1].split()[0])
+    assert queries < 10
+
+
+def test_batch_update_rejects_null_title(client, auth_headers):
+    task_id = client.post("/tasks", json={"title": "keep"}, headers=auth_headers).json()["id"]
+
+    response = client.patch("/tasks/batch", json=[{"id": task_id, "title": None}], headers=auth_headers)
+    assert response.status_code == 422
+    assert client.get(f"/tasks/{task_id}", headers=auth_headers).json()["title"] == "keep"
+
+def test_batch_rejects_other_users_tasks(client, auth_headers):
+    task_id = client.post("/tasks", json={"title": "mine"}, headers=auth_headers).json()["id"]
+    client.post("/registration", json={"email": "other@example.com", "password": "password123"})
+    other = client.post("/login", json={"email": "other@example.com", "password": "password123"})
+    other_headers = {"Authorization": f"Bearer {other.json()['access_token']}"}
+
+    response = client.request("DELETE", "/tasks/batch", json={"ids": [task_id]}, headers=other_headers)
+    assert response.json() == [{"id": task_id, "status": "forbidden", "task": None}]
+    assert client.get(f"/tasks/{task_id}", headers=auth_headers).status_code == 200
+
+
+def test_import_ndjson_reports_line_errors(client, auth_headers, monkeypatch):
+    monkeypatch.setattr(main, "TASK_IMPORT_CHUNK_SIZE", 2)
+    body = "\n".join([
+        '{"title": "one"}',
+        '{"title": "two", "due_date": "2030-01-01T00:00:00"}',
+        "not json",
+        "",
+        '{"description": "missing title"}',
+        '{"title": "three"}',
+    ])
+
+    response = client.post(
+        "/tasks/import",
+        files={"file": ("tasks.ndjson", body, "application/x-ndjson")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"] == 3
+    assert result["failed"] == 2
+    assert [error["line"] for error in result["errors"]] == [3, 5]
+    assert len(client.get("/tasks", headers=auth_headers).json()) == 3
+
+
+def test_import_csv_round_trips_export(client, auth_headers):
+    client.post("/tasks", json={"title": "multi\nline", "description": "a, \"quoted\" text"}, headers=auth_headers)
+    exported = client.get("/tasks/export", params={"format": "csv"}, headers=auth_headers).text
+
+    response = client.post(
+        "/tasks/import",
+        params={"format": "csv"},
+        files={"file": ("tasks.csv", exported, "text/csv")},
+        headers=auth_headers,
+    )
+    assert response.json() == {"imported": 1, "failed": 0, "errors": []}
+    titles = [task["title"] for task in client.get("/tasks", headers=auth_headers).json()]
+    assert titles == ["multi\nline", "multi\nline"]
+
+
+def test_import_reports_invalid_utf8(client, auth_headers):
+    ndjson = b'{"title": "one"}\n{"title": "\xff\xfe"}\n{"title": "two"}\n'
+    response = client.post(
+        "/tasks/import",
+        files={"file": ("tasks.ndjson", ndjson, "application/x-ndjson")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["imported"], result["failed"]) == (2, 1)
+    assert result["errors"][0]["line"] == 2
+    assert result["errors"][0]["error"].startswith("Invalid UTF-8")
+
+    csv_body = b"title,description\nok,fine\nbad,\xc3\x28\nlater,skipped\n"
+    response = client.post(
+        "/tasks/import",
+        params={"format": "csv"},
+        files={"file": ("tasks.csv", csv_body, "text/csv")},
+        headers=auth_headers,
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["imported"], result["failed"]) == (1, 1)
+    assert result["errors"][0]["line"] == 3
+
+
+def test_search_is_ranked_and_owner_scoped(client, auth_headers):
+    client.post("/tasks", json={"title": "Купить молоко", "description": "и хлеб"}, headers=auth_headers)
+    client.post("/tasks", json={"title": "Отчёт", "description": "молоко упомянуто вскользь"}, headers=auth_headers)
+    client.post("/tasks", json={"title": "Спорт"}, headers=auth_headers)
+    client.post("/registration", json={"email": "other@example.com", "password": "password123"})
+    other = client.post("/login", json={"email": "other@example.com", "password": "password123"})
+    other_headers = {"Authorization": f"Bearer {other.json()['access_token']}"}
+    client.post("/tasks", json={"title": "Чужое молоко"}, headers=other_headers)
+
+    response = client.get("/tasks/search", params={"q": "молок"}, headers=auth_headers)
+    assert response.status_code == 200
+    results = response.json()
+    assert {result["title"] for result in results} == {"Купить молоко", "Отчёт"}
+    assert all("[" in result["snippet"] for result in results)
+    assert results[0]["rank"] <= results[1]["rank"]
+
+    task_id = results[0]["id"]
+    client.patch(f"/tasks/{task_id}", json={"title": "Купить кефир", "description": ""}, headers=auth_headers)
+    client.delete(f"/tasks/{results[1]['id']}", headers=auth_headers)
+    assert client.get("/tasks/search", params={"q": "молок"}, headers=auth_headers).json() == []
+    assert client.get("/tasks/search", params={"q": '"'}, headers=auth_headers).status_code == 200
+    assert client.get("/tasks/search", params={"q": "  "}, headers=auth_headers).status_code == 400
+
+
+def test_list_etag_returns_304_until_tasks_change(client, auth_headers):
+    create_tasks(client, auth_headers, 2)
+    first = client.get("/tasks", headers=auth_headers)
+    etag = first.headers["ETag"]
+    assert "Last-Modified" in first.headers
+
+    cached = client.get("/tasks", headers={**auth_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    other_query = client.get("/tasks", params={"limit": 1}, headers={**auth_headers, "If-None-Match": etag})
+    assert other_query.status_code == 200
+
+    create_tasks(client, auth_headers, 1)
+    changed = client.get("/tasks", headers={**auth_headers, "If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_list_etag_is_per_user(client, auth_headers):
+    client.post("/registration", json={"email": "other@example.com", "password": "password123"})
+    other = client.post("/login", json={"email": "other@example.com", "password": "password123"})
+    other_headers = {"Authorization": f"Bearer {other.json()['access_token']}"}
+    create_tasks(client, auth_headers, 1)
+    create_tasks(client, other_headers, 1)
+
+    mine = client.get("/tasks", headers=auth_headers)
+    assert mine.headers["Vary"] == "Authorization, Cookie"
+
+    theirs = client.get("/tasks", headers={**other_headers, "If-None-Match": mine.headers["ETag"]})
+    assert theirs.status_code == 200
+    assert theirs.headers["ETag"] != mine.headers["ETag"]
+
+
+def test_task_etag_conditional_requests(client, auth_headers):
+    task_id = client.post("/tasks", json={"title": "task"}, headers=auth_headers).json()["id"]
+    etag = client.get(f"/tasks/{task_id}", headers=auth_headers).headers["ETag"]
+
+    cached = client.get(f"/tasks/{task_id}", headers={**auth_headers, "If-None-Match": etag})
+    assert cached.status_code == 304
+
+    updated = client.patch(
+        f"/tasks/{task_id}", json={"is_done": True}, headers={**auth_headers, "If-Match": etag}
+    )
+    assert updated.status_code == 200
+    assert updated.headers["ETag"] != etag
+
+    stale_patch = client.patch(
+        f"/tasks/{task_id}", json={"title": "lost update"}, headers={**auth_headers, "If-Match": etag}
+    )
+    assert stale_patch.status_code == 412
+    stale_delete = client.delete(f"/tasks/{task_id}", headers={**auth_headers, "If-Match": etag})
+    assert stale_delete.status_code == 412
+
+    client.patch("/tasks/batch", json=[{"id": task_id, "title": "batch"}], headers=auth_headers)
+    assert client.get(f"/tasks/{task_id}", headers={**auth_headers, "If-None-Match": updated.headers["ETag"]}).status_code == 200
+
+
+def test_task_stats_are_maintained_and_repairable(client, engine, auth_headers):
+    client.post("/tasks", json={"title": "overdue", "due_date": "2000-01-01T00:00:00"}, headers=auth_headers)
+    client.post("/tasks/batch", json=[{"title": "a"}, {"title": "b"}], headers=auth_headers)
+    task_id = client.get("/tasks", headers=auth_headers).json()[0]["id"]
+    client.patch(f"/tasks/{task_id}", json={"is_done": True}, headers=auth_headers)
+    client.delete(f"/tasks/{task_id}", headers=auth_headers)
+    client.post("/tasks", json={"title": "done later"}, headers=auth_headers)
+
+    stats = client.get("/tasks/stats", headers=auth_headers).json()
+    assert (stats["total"], stats["done"], stats["active"], stats["overdue"]) == (3, 0, 3, 1)
+    assert stats["last_activity"] is not None
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql("UPDATE user_task_stats SET total = 100, done = 50")
+        rebuild_task_stats(connection)
+    repaired = client.get("/tasks/stats", headers=auth_headers).json()
+    assert (repaired["total"], repaired["done"]) == (3, 0)
+
+
+def test_task_list_fast_path_matches_task_out(client, engine, auth_headers):
+    client.post(
+        "/tasks",
+        json={"title": "with details", "description": "описание", "due_date": "2030-01-02T03:04:05.678901"},
+        headers=auth_headers,
+    )
+    create_tasks(client, auth_headers, 2)
+
+    listed = client.get("/tasks", headers=auth_headers).json()
+
+    with Session(engine) as db:
+        tasks = db.query(Task).order_by(Task.created_at.desc(), Task.id.desc()).all()
+        expected = [TaskOut.model_validate(task).model_dump(mode="json") for task in tasks]
+    assert listed == expected
+
+
+def test_task_list_keeps_openapi_schema(client):
+    schema = client.get("/openapi.json").json()
+    response = schema["paths"]["/tasks"]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+    assert response["items"] == {"$ref": "#/components/schemas/TaskOut"}
+
+
+def test_task_list_sparse_fieldset(client, auth_headers):
+    create_tasks(client, auth_headers, 3)
+
+    first = client.get("/tasks?limit=2&fields=title,is_done", headers=auth_headers)
+    assert first.status_code == 200
+    assert [set(task) for task in first.json()] == [{"title", "is_done"}] * 2
+
+    cursor = first.headers["X-Next-Cursor"]
+    second = client.get(f"/tasks?limit=2&fields=title&cursor={cursor}", headers=auth_headers)
+    assert second.json() == [{"title": "task 0"}]
+
+    full = client.get("/tasks?limit=2", headers=auth_headers)
+    assert first.headers["ETag"] != full.headers["ETag"]
+
+
+def test_task_list_statement_selects_only_requested_columns():
+    statement = task_list_statement(1, fields=parse_fields("title, due_date"))
+    assert [column.key for column in statement.selected_columns] == ["title", "due_date", "created_at", "id"]
+
+
+def test_task_sparse_fieldset(client, auth_headers):
+    task_id = client.post(
+        "/tasks", json={"title": "sparse", "description": "x" * 1000}, headers=auth_headers
+    ).json()["id"]
+
+    response = client.get(f"/tasks/{task_id}?fields=id,title", headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json() == {"id": task_id, "title": "sparse"}
+
+    full = client.get(f"/tasks/{task_id}", headers=auth_headers)
+    assert response.headers["ETag"] != full.headers["ETag"]
+    other_fields = client.get(
+        f"/tasks/{task_id}?fields=title",
+        headers={**auth_headers, "If-None-Match": response.headers["ETag"]},
+    )
+    assert other_fields.status_code == 200
+    full_with_sparse_etag = client.get(
+        f"/tasks/{task_id}", headers={**auth_headers, "If-None-Match": response.headers["ETag"]}
+    )
+    assert full_with_sparse_etag.status_code == 200
+    cached = client.get(
+        f"/tasks/{task_id}?fields=title,id",
+        headers={**auth_headers, "If-None-Match": response.headers["ETag"]},
+    )
+    assert cached.status_code == 304
+
+
+def test_unknown_fields_are_rejected(client, auth_headers):
+    task_id = client.post("/tasks", json={"title": "t"}, headers=auth_headers).json()["id"]
+
+    response = client.get("/tasks?fields=title,password", headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: password"
+    assert client.get(f"/tasks/{task_id}?fields=", headers=auth_headers).status_code == 400
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from conftest import assert_no_table_scans
+from database import RefreshToken, RevokedAccessToken, User
+from token_gc import sweep_refresh_tokens, sweep_stats
+
+
+def add_tokens(engine, count, expires_in, revoked_ago=None):
+    now = datetime.now(timezone.utc)
+    with Session(engine) as db:
+        user = db.query(User).first()
+        if not user:
+            user = User(email="gc@example.com", password="x", permissions="user")
+            db.add(user)
+            db.flush()
+        for _ in range(count):
+            db.add(
+                RefreshToken(
+                    token_hash=uuid4().hex,
+                    user_id=user.id,
+                    expires_at=now + expires_in,
+                    revoked_at=now - revoked_ago if revoked_ago is not None else None,
+                )
+            )
+        db.commit()
+
+
+def count_tokens(engine):
+    with engine.connect() as connection:
+        return connection.execute(select(func.count()).select_from(RefreshToken)).scalar_one()
+
+
+def test_sweep_deletes_only_expired_tokens(engine):
+    add_tokens(engine, 7, expires_in=timedelta(days=-1))
+    add_tokens(engine, 3, expires_in=timedelta(days=-1), revoked_ago=timedelta(days=2))
+    add_tokens(engine, 2, expires_in=timedelta(days=3), revoked_ago=timedelta(days=2))
+    add_tokens(engine, 4, expires_in=timedelta(days=3))
+    runs = sweep_stats.runs
+
+    deleted = sweep_refresh_tokens(engine, batch_size=3)
+
+    assert deleted == 10
+    assert count_tokens(engine) == 6
+    assert sweep_stats.runs == runs + 1
+    assert sweep_stats.last_deleted == 10
+
+
+def test_reuse_is_detected_after_sweep(client, engine):
+    credentials = {"email": "gc@example.com", "password": "password123"}
+    client.post("/registration", json=credentials)
+    tokens = client.post("/login", json=credentials).json()
+    rotated = client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]}).json()
+    with Session(engine) as db:
+        for token in db.query(RefreshToken).filter(RefreshToken.revoked_at.is_not(None)):
+            token.revoked_at -= timedelta(days=2)
+        db.commit()
+
+    sweep_refresh_tokens(engine)
+
+    replay = client.post("/token/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert replay.status_code == 401
+    descendant = client.post("/token/refresh", json={"refresh_token": rotated["refresh_token"]})
+    assert descendant.status_code == 401
+
+
+def test_sweep_plan_uses_indexes(engine, captured_selects):
+    add_tokens(engine, 1, expires_in=timedelta(days=-1))
+    captured_selects.clear()
+
+    sweep_refresh_tokens(engine)
+
+    assert_no_table_scans(engine, captured_selects)
+
+
+def test_sweep_deletes_expired_access_token_revocations(engine):
+    add_tokens(engine, 1, expires_in=timedelta(days=3))
+    now = datetime.now(timezone.utc)
+    with Session(engine) as db:
+        user_id = db.query(User).first().id
+        db.add(RevokedAccessToken(jti="old", user_id=user_id, expires_at=now - timedelta(minutes=1)))
+        db.add(RevokedAccessToken(jti="live", user_id=user_id, expires_at=now + timedelta(minutes=30)))
+        db.commit()
+
+    assert sweep_refresh_tokens(engine) == 1
+    with Session(engine) as db:
+        assert [row.jti for row in db.query(RevokedAccessToken)] == ["live"]
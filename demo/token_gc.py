@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from threading import Lock
+
+from sqlalchemy import delete, select
+from starlette.concurrency import run_in_threadpool
+
+from config import REFRESH_TOKEN_GC_BATCH_SIZE, REFRESH_TOKEN_GC_INTERVAL_SECONDS
+from database import RefreshToken, RevokedAccessToken
+
+logger = logging.getLogger(__name__)
+
+
+class SweepStats:
+    def __init__(self):
+        self._lock = Lock()
+        self.runs = 0
+        self.deleted = 0
+        self.failures = 0
+        self.last_deleted = 0
+        self.last_run_at = None
+        self.last_duration = 0.0
+
+    def record(self, deleted: int, duration: float) -> None:
+        with self._lock:
+            self.runs += 1
+            self.deleted += deleted
+            self.last_deleted = deleted
+            self.last_run_at = datetime.now(timezone.utc)
+            self.last_duration = duration
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "runs": self.runs,
+                "deleted": self.deleted,
+                "failures": self.failures,
+                "last_deleted": self.last_deleted,
+                "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+                "last_duration": round(self.last_duration, 4),
+            }
+
+
+sweep_stats = SweepStats()
+
+
+def stale_refresh_tokens_statement(now: datetime, limit: int):
+    # отозванные строки живут до истечения токена: по ним ловится повторное использование
+    return select(RefreshToken.id).where(RefreshToken.expires_at <= now).limit(limit)
+
+
+def expired_access_tokens_statement(now: datetime, limit: int):
+    return select(RevokedAccessToken.jti).where(RevokedAccessToken.expires_at <= now).limit(limit)
+
+
+def _delete_in_batches(engine, select_batch, key_column, batch_size: int) -> int:
+    # каждая пачка в своей транзакции, чтобы не держать блокировку записи
+    deleted = 0
+    while True:
+        with engine.begin() as connection:
+            keys = connection.execute(select_batch).scalars().all()
+            if keys:
+                connection.execute(delete(key_column.table).where(key_column.in_(keys)))
+        deleted += len(keys)
+        if len(keys) < batch_size:
+            return deleted
+
+
+def sweep_refresh_tokens(engine, batch_size: int = REFRESH_TOKEN_GC_BATCH_SIZE) -> int:
+    started = time.perf_counter()
+    now = datetime.now(timezone.utc)
+    deleted = _delete_in_batches(
+        engine,
+        stale_refresh_tokens_statement(now, batch_size),
+        RefreshToken.id,
+        batch_size,
+    )
+    deleted += _delete_in_batches(
+        engine,
+        expired_access_tokens_statement(now, batch_size),
+        RevokedAccessToken.jti,
+        batch_size,
+    )
+    sweep_stats.record(deleted, time.perf_counter() - started)
+    return deleted
+
+
+async def run_refresh_token_gc(engine, interval: float = REFRESH_TOKEN_GC_INTERVAL_SECONDS) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            deleted = await run_in_threadpool(sweep_refresh_tokens, engine)
+        except Exception:
+            sweep_stats.record_failure()
+            logger.exception("Refresh token sweep failed")
+        else:
+            logger.info("Refresh token sweep deleted %s rows", deleted)